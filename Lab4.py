@@ -1,8 +1,13 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Date, Float, Enum, exists
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy import (Column, Integer, String, ForeignKey, Date, Float, Enum, Index, and_, exists, func, inspect,
+                        or_, text)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import relationship
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 from sqlalchemy.ext.declarative import declarative_base
 import enum
 import datetime
+from dataclasses import dataclass, field
 
 Base = declarative_base()
 
@@ -51,7 +56,10 @@ class Room(Base):
     type_id = Column(Integer, ForeignKey('room_type.id'))
     status = Column(Enum(RoomStatus))
     price_per_night = Column(Float)
+    # Оптимістичне блокування: UPDATE/DELETE перевіряють версію, прочитану разом із записом
+    version = Column(Integer, nullable=False, server_default="1")
     type = relationship("RoomType")
+    __mapper_args__ = {"version_id_col": version}
 
 class Service(Base):
     __tablename__ = 'service'
@@ -61,9 +69,16 @@ class Service(Base):
 
 class GuestService(Base):
     __tablename__ = 'guest_service'
+    __table_args__ = (
+        # Рахунок бронювання відбирає послуги гостя за датою в межах проживання
+        Index('ix_guest_service_guest_date', 'guest_id', 'date'),
+    )
     id = Column(Integer, primary_key=True)
-    guest_id = Column(Integer, ForeignKey('guest.id'))
+    guest_id = Column(Integer, ForeignKey('guest.id'), index=True)
     service_id = Column(Integer, ForeignKey('service.id'))
+    date = Column(Date)
+    guest = relationship("Guest")
+    service = relationship("Service")
 
 class Position(Base):
     __tablename__ = 'position'
@@ -85,6 +100,11 @@ class Staff(Base):
 
 class Booking(Base):
     __tablename__ = 'booking'
+    __table_args__ = (
+        # Перевірка перетину бронювань фільтрує саме за цими полями
+        Index('ix_booking_availability', 'room_id', 'status', 'check_in', 'check_out'),
+        Index('ix_booking_guest_id', 'guest_id'),
+    )
     id = Column(Integer, primary_key=True)
     guest_id = Column(Integer, ForeignKey('guest.id'))
     room_id = Column(Integer, ForeignKey('room.id'))
@@ -92,24 +112,215 @@ class Booking(Base):
     check_out = Column(Date)
     status = Column(Enum(BookingStatus))
     price_per_night = Column(Float)
+    version = Column(Integer, nullable=False, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
 class Payment(Base):
     __tablename__ = 'payment'
     id = Column(Integer, primary_key=True)
-    booking_id = Column(Integer, ForeignKey('booking.id'))
+    booking_id = Column(Integer, ForeignKey('booking.id'), index=True)
     amount = Column(Float)
     date = Column(Date)
     method = Column(Enum(PaymentMethod))
+    version = Column(Integer, nullable=False, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
+# Календар зайнятості: кількість активних бронювань кімнати на кожну ніч
+class RoomNight(Base):
+    __tablename__ = 'room_night'
+    __table_args__ = (
+        Index('ix_room_night_date', 'date', 'room_id', 'booked_count'),
+    )
+    room_id = Column(Integer, ForeignKey('room.id'), primary_key=True)
+    date = Column(Date, primary_key=True)
+    booked_count = Column(Integer, nullable=False, default=0)
+
+# Додає delta до кожної ночі бронювання [check_in, check_out) в поточній транзакції
+def book_room_nights(session, room_id, check_in, check_out, delta=1):
+    nights = [
+        {"room_id": room_id, "date": check_in + datetime.timedelta(days=i), "booked_count": delta}
+        for i in range((check_out - check_in).days)
+    ]
+    add_room_nights(session, nights)
+    if delta < 0:
+        session.query(RoomNight).filter(
+            RoomNight.room_id == room_id,
+            RoomNight.date >= check_in,
+            RoomNight.date < check_out,
+            RoomNight.booked_count <= 0
+        ).delete(synchronize_session=False)
+
+# Приріст booked_count для довільного набору кімнат і ночей одним executemany.
+# nights: [{"room_id": ..., "date": ..., "booked_count": приріст}]
+def add_room_nights(session, nights):
+    if not nights:
+        return
+    stmt = sqlite_insert(RoomNight)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[RoomNight.room_id, RoomNight.date],
+        set_={"booked_count": RoomNight.booked_count + stmt.excluded.booked_count}
+    ), nights)
+
+# Найбільша кількість бронювань кімнати за одну ніч у періоді [check_in, check_out)
+def peak_room_nights(session, room_id, check_in, check_out):
+    return session.query(func.coalesce(func.max(RoomNight.booked_count), 0)).filter(
+        RoomNight.room_id == room_id,
+        RoomNight.date >= check_in,
+        RoomNight.date < check_out
+    ).scalar()
+
+# Перенесення бронювання в календарі при зміні дат або статусу (API, CLI, інтерфейс). Власні ночі
+# бронювання спершу знімаються, тож перевірка місць на нових датах їх не враховує. Повертає False,
+# якщо на нових датах кімната вже заповнена — викликач тоді відкочує транзакцію
+# (зміни самого бронювання записуються при commit, де їх перевіряє версія)
+def move_room_nights(session, booking, was_active, old_check_in, old_check_out):
+    with session.no_autoflush:
+        if was_active:
+            book_room_nights(session, booking.room_id, old_check_in, old_check_out, -1)
+        if booking.status.value != BookingStatus.Активно.value:
+            return True
+        if not was_active or (booking.check_in, booking.check_out) != (old_check_in, old_check_out):
+            max_guests = session.query(RoomType.max_guests).join(Room, Room.type_id == RoomType.id) \
+                .filter(Room.id == booking.room_id).scalar()
+            if max_guests is not None and \
+                    peak_room_nights(session, booking.room_id, booking.check_in, booking.check_out) >= max_guests:
+                return False
+        book_room_nights(session, booking.room_id, booking.check_in, booking.check_out)
+    return True
+
+# Перебудова календаря з активних бронювань одним запитом
+def rebuild_room_nights(conn):
+    conn.execute(text("DELETE FROM room_night"))
+    conn.execute(text("""
+        WITH RECURSIVE nights(room_id, date, check_out) AS (
+            SELECT room_id, check_in, check_out FROM booking
+            WHERE status = :active AND check_out > check_in
+            UNION ALL
+            SELECT room_id, date(date, '+1 day'), check_out FROM nights
+            WHERE date(date, '+1 day') < check_out
+        )
+        INSERT INTO room_night (room_id, date, booked_count)
+        SELECT room_id, date, count(*) FROM nights GROUP BY room_id, date
+    """), {"active": BookingStatus.Активно.name})
+
+# Рахунок за бронювання: проживання та послуги гостя, отримані з дня заїзду по день виїзду
+@dataclass
+class InvoiceLine:
+    service_id: int
+    name: str
+    price: float
+    quantity: int
+
+    @property
+    def amount(self):
+        return self.price * self.quantity
+
+@dataclass
+class Invoice:
+    booking_id: int
+    nights: int
+    price_per_night: float
+    services: list = field(default_factory=list)
+
+    @property
+    def room_cost(self):
+        return self.nights * self.price_per_night
+
+    @property
+    def service_cost(self):
+        return sum(line.amount for line in self.services)
+
+    @property
+    def total(self):
+        return self.room_cost + self.service_cost
+
+# Послуги рахуються одним агрегатним запитом; записи без дати не належать жодному проживанню.
+# День виїзду належить цьому проживанню, лише якщо того ж дня в гостя не починається наступне
+# (заселення "з рук у руки"), — інакше послуга цього дня потрапила б в обидва рахунки
+def compute_invoice(session, booking):
+    next_stay = exists().where(
+        Booking.guest_id == booking.guest_id,
+        Booking.id != booking.id,
+        Booking.check_in == booking.check_out,
+        Booking.status != BookingStatus.Скасовано
+    )
+    rows = session.query(Service.id, Service.name, Service.price, func.count(GuestService.id)) \
+        .join(GuestService, GuestService.service_id == Service.id) \
+        .filter(
+            GuestService.guest_id == booking.guest_id,
+            GuestService.date >= booking.check_in,
+            or_(GuestService.date < booking.check_out,
+                and_(GuestService.date == booking.check_out, ~next_stay))
+        ).group_by(Service.id).order_by(Service.name).all()
+    return Invoice(
+        booking_id=booking.id,
+        nights=(booking.check_out - booking.check_in).days,
+        price_per_night=booking.price_per_night,
+        services=[InvoiceLine(service_id, name, price or 0, quantity) for service_id, name, price, quantity in rows]
+    )
+
+# Додає до існуючих таблиць колонки, що з'явились у моделях пізніше. conn — з'єднання
+# у транзакції upgrade_schema: колонки перевіряються вже під її блокуванням
+def add_missing_columns(conn):
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column.type.compile(dialect=conn.dialect)}'
+                # Існуючі рядки отримують значення за замовчуванням (напр. version = 1)
+                if column.server_default is not None:
+                    ddl += f" NOT NULL DEFAULT {column.server_default.arg}" if not column.nullable \
+                        else f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+
+# Модуль бази: Lab4 імпортується як hotel.Lab4 (API, інтерфейс, тести) або запускається
+# скриптом python Lab4.py — тоді пакета немає, і db береться з тієї ж теки
+def hotel_db():
+    if __package__:
+        from hotel import db
+    else:
+        import db
+    return db
+
+# Збереження змін з перевіркою версії: якщо запис змінили в іншому місці (API, інтерфейс),
+# зміни відкочуються, а не перезаписують чужі. Поки CLI чекає на введення, транзакція читання
+# відкрита, і SQLite у режимі WAL відхиляє запис поверх новішого знімка як "database is locked"
+def commit_or_report_conflict(session):
+    try:
+        session.commit()
+    except (StaleDataError, OperationalError) as error:
+        if isinstance(error, OperationalError) and not hotel_db().is_busy(error):
+            raise
+        session.rollback()
+        print("Запис змінено іншим користувачем. Зміни не збережено, спробуйте ще раз.\n")
+        return False
+    return True
+
+# Оновлення існуючої бази: створює відсутні таблиці та індекси, повторний запуск безпечний.
+# Кожен воркер API викликає його при старті одночасно з іншими, тож уся зміна схеми — одна
+# транзакція BEGIN IMMEDIATE (DDL у SQLite транзакційний): наступний процес чекає на блокування
+# і перевіряє таблиці та колонки вже після змін попереднього, а не додає ті самі ще раз
+def upgrade_schema(engine):
+    with engine.connect() as conn:
+        conn.execution_options(sqlite_begin="IMMEDIATE")
+        with conn.begin():
+            Base.metadata.create_all(conn)
+            add_missing_columns(conn)
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
+            if not conn.execute(text("SELECT 1 FROM room_night LIMIT 1")).first():
+                rebuild_room_nights(conn)
 
 # Підключення до SQLite
 def main():
     # Підключення до бази
-    engine = create_engine('sqlite:///hotel_management.db')
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    db = hotel_db()
 
-    # Створення таблиць, якщо ще не створені
-    Base.metadata.create_all(engine)
+    # Створення таблиць та індексів, якщо ще не створені
+    upgrade_schema(db.get_engine())
+    session = db.SessionLocal()
 
     print("--- Система управління готелем ---")
     
@@ -431,8 +642,8 @@ def edit_room(session):
     room.status = RoomStatus[status]
     room.price_per_night = float(input(f"Ціна за ніч [{room.price_per_night}]: ") or room.price_per_night)
 
-    session.commit()
-    print("Кімната оновлена.\n")
+    if commit_or_report_conflict(session):
+        print("Кімната оновлена.\n")
 
 def delete_room(session):
     room_id = int(input("ID кімнати для видалення: "))
@@ -835,12 +1046,7 @@ def add_booking(session):
         return
 
     # Перевірка на кількість активних бронювань у той самий період
-    overlapping_bookings = session.query(Booking).filter(
-        Booking.room_id == room_id,
-        Booking.status == BookingStatus.Активно,
-        Booking.check_out > check_in,
-        Booking.check_in < check_out
-    ).count()
+    overlapping_bookings = peak_room_nights(session, room_id, check_in, check_out)
 
     max_guests = room.type.max_guests
     if overlapping_bookings >= max_guests:
@@ -856,6 +1062,7 @@ def add_booking(session):
         price_per_night=room.price_per_night
     )
     session.add(booking)
+    book_room_nights(session, room_id, check_in, check_out)
 
     # Позначити як зайняту, якщо вже буде заповнена
     if overlapping_bookings + 1 >= max_guests:
@@ -901,6 +1108,7 @@ def edit_booking(session):
     if not booking:
         print("Бронювання не знайдено.\n")
         return
+    old_period = (booking.status, booking.check_in, booking.check_out)
 
     print(f"Поточний статус: {booking.status.value}")
     print("Статуси:")
@@ -934,8 +1142,13 @@ def edit_booking(session):
         print("Невірний формат дати.")
         return
 
-    session.commit()
-    print("Бронювання оновлено.\n")
+    old_status, old_check_in, old_check_out = old_period
+    if not move_room_nights(session, booking, old_status == BookingStatus.Активно, old_check_in, old_check_out):
+        session.rollback()
+        print("Кімната вже зайнята на ці дати. Зміни не збережено.\n")
+        return
+    if commit_or_report_conflict(session):
+        print("Бронювання оновлено.\n")
 
 def delete_booking(session):
     view_bookings(session)
@@ -948,9 +1161,11 @@ def delete_booking(session):
     room = session.query(Room).get(booking.room_id)
     if room:
         room.status = RoomStatus.Вільний
+    if booking.status == BookingStatus.Активно:
+        book_room_nights(session, booking.room_id, booking.check_in, booking.check_out, -1)
     session.delete(booking)
-    session.commit()
-    print("Бронювання видалено.\n")
+    if commit_or_report_conflict(session):
+        print("Бронювання видалено.\n")
 
 def sort_bookings_by_check_in(session):
     bookings = session.query(Booking).order_by(Booking.check_in).all()
@@ -1030,7 +1245,7 @@ def add_guest_service(session):
         print("Невірний формат ID.")
         return
 
-    guest_service = GuestService(guest_id=guest_id, service_id=service_id)
+    guest_service = GuestService(guest_id=guest_id, service_id=service_id, date=datetime.date.today())
     session.add(guest_service)
     session.commit()
     print("Послуга гостю додана.\n")
@@ -1185,22 +1400,14 @@ def add_payment(session):
             continue
         break  # Вірний booking_id
 
-    # Розрахунок вартості номера
-    num_nights = (booking.check_out - booking.check_in).days
-    room_cost = num_nights * booking.price_per_night
-
-    # Розрахунок сервісів
-    guest_services = session.query(GuestService).filter_by(guest_id=booking.guest_id).all()
-    service_cost = 0
-    for gs in guest_services:
-        service = session.query(Service).get(gs.service_id)
-        if service:
-            service_cost += service.price
+    # Розрахунок вартості номера та послуг за час проживання
+    invoice = compute_invoice(session, booking)
+    total_amount = invoice.total
 
-    total_amount = room_cost + service_cost
-
-    print(f"\n Ціна за номер: {room_cost} грн")
-    print(f"Ціна за сервіси: {service_cost} грн")
+    print(f"\n Ціна за номер: {invoice.room_cost} грн ({invoice.nights} ноч. x {invoice.price_per_night} грн)")
+    for line in invoice.services:
+        print(f"  {line.name}: {line.quantity} x {line.price} = {line.amount} грн")
+    print(f"Ціна за сервіси: {invoice.service_cost} грн")
     print(f"Загальна сума до сплати: {total_amount} грн")
 
     # Введення методу оплати
@@ -1282,8 +1489,8 @@ def edit_payment(session):
             return
         payment.method = PaymentMethod(method_input)
 
-    session.commit()
-    print("Дані оплати оновлено.\n")
+    if commit_or_report_conflict(session):
+        print("Дані оплати оновлено.\n")
 
 def delete_payment(session):
     view_payments(session)
@@ -0,0 +1,103 @@
+import argparse
+import time
+from hotel import compaction, db, guest_log, importers
+from hotel.Lab4 import upgrade_schema
+
+# Командний рядок пакета: python -m hotel import guests guests.csv [--batch-size 5000]
+#                         python -m hotel import guest-log guest_data.txt
+#                         python -m hotel lookup guest_data.jsonl --passport АА123456
+#                         python -m hotel compact guest_data.txt guest_archive [--gzip] [--rotate]
+def import_guests(args):
+    from hotel.lab5 import GuestCreate
+
+    file_format = args.format or importers.detect_format(args.file)
+    if file_format not in importers.FORMATS:
+        raise SystemExit(f"Невідомий формат файлу {args.file}: вкажіть --format csv або jsonl")
+    upgrade_schema(db.get_engine())
+    started = time.perf_counter()
+    with open(args.file, encoding="utf-8-sig", newline="") as stream, db.session_scope() as session:
+        db.begin_immediate(session)
+        report = importers.import_guests(session, importers.read_rows(stream, file_format), GuestCreate,
+                                         args.batch_size)
+    seconds = time.perf_counter() - started
+    print(f"Імпортовано {report.imported} з {report.total} рядків за {seconds:.2f} с "
+          f"({report.imported / seconds:.0f} рядків/с)")
+    if report.failed:
+        print(f"Помилок: {report.failed}")
+        for error in report.errors:
+            print(f"  рядок {error.line}: {error.detail}")
+        if report.failed > len(report.errors):
+            print(f"  ... та ще {report.failed - len(report.errors)}")
+
+def import_guest_log(args):
+    upgrade_schema(db.get_engine())
+    checkpoint = None if args.no_checkpoint else args.checkpoint or f"{args.file}.checkpoint"
+    with open(args.file, "rb") as stream, db.SessionLocal() as session:
+        report = importers.import_guest_log(session, stream, checkpoint, args.batch_size, begin=db.begin_immediate,
+                                            fmt=args.format or guest_log.detect_format(args.file))
+    print(f"Імпортовано {report.imported} з {report.total} записів журналу за {report.seconds:.2f} с "
+          f"({report.rows_per_second:.0f} записів/с)")
+    if checkpoint:
+        print(f"Контрольна точка: {checkpoint}")
+    if report.failed:
+        print(f"Пропущено записів: {report.failed}")
+        for error in report.errors:
+            print(f"  байт {error.line}: {error.detail}")
+
+def lookup(args):
+    log = guest_log.GuestLog(args.file, args.format)
+    records = log.lookup(args.passport) if args.passport else log.lookup_phone(args.phone)
+    if not records:
+        print("Записів не знайдено")
+    for record in records:
+        print(record.to_text(), end="")
+
+def compact(args):
+    report = compaction.compact(args.file, args.directory, args.segment_mb * 1024 * 1024, args.gzip, args.rotate)
+    print(f"Ущільнено {report.records} нових записів: гостей {report.guests}, сегментів {report.segments}")
+    print(f"Журнал {report.source_bytes / 1024 / 1024:.1f} МБ -> {report.compacted_bytes / 1024 / 1024:.1f} МБ "
+          f"у {args.directory}")
+    if report.failed:
+        print(f"Пропущено некоректних записів: {report.failed}")
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m hotel", description="Система управління готелем")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("import", help="масовий імпорт даних").add_subparsers(dest="entity", required=True)
+    guests = imports.add_parser("guests", help="гості з CSV або JSONL")
+    guests.add_argument("file")
+    guests.add_argument("--format", choices=importers.FORMATS, help="за замовчуванням — за розширенням файлу")
+    guests.add_argument("--batch-size", type=int, default=importers.DEFAULT_BATCH_SIZE)
+    guests.set_defaults(func=import_guests)
+
+    log = imports.add_parser("guest-log", help="журнал заселень lab3 (guest_data.txt або .jsonl)")
+    log.add_argument("file")
+    log.add_argument("--checkpoint", help="файл контрольної точки, за замовчуванням FILE.checkpoint")
+    log.add_argument("--no-checkpoint", action="store_true", help="читати з початку і не зберігати зсув")
+    log.add_argument("--format", choices=guest_log.FORMATS, help="за замовчуванням — за розширенням файлу")
+    log.add_argument("--batch-size", type=int, default=importers.DEFAULT_BATCH_SIZE)
+    log.set_defaults(func=import_guest_log)
+
+    search = commands.add_parser("lookup", help="записи гостя в журналі заселень за індексом")
+    search.add_argument("file")
+    search.add_argument("--format", choices=guest_log.FORMATS, help="за замовчуванням — за розширенням файлу")
+    key = search.add_mutually_exclusive_group(required=True)
+    key.add_argument("--passport")
+    key.add_argument("--phone")
+    search.set_defaults(func=lookup)
+
+    archive = commands.add_parser("compact", help="ущільнення журналу заселень lab3 у таблицю гостей і сегменти")
+    archive.add_argument("file")
+    archive.add_argument("directory")
+    archive.add_argument("--segment-mb", type=int, default=compaction.DEFAULT_SEGMENT_BYTES // 1024 // 1024)
+    archive.add_argument("--gzip", action="store_true", help="стискати сегменти")
+    archive.add_argument("--rotate", action="store_true",
+                         help="перейменувати журнал перед ущільненням і видалити його після; lab3 створить новий")
+    archive.set_defaults(func=compact)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,698 @@
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+from hotel.Lab4 import (Base, Guest, RoomType, Room, Booking, Service, GuestService, RoomStatus, BookingStatus,
+                        upgrade_schema, rebuild_room_nights, compute_invoice)
+from hotel import db
+from hotel.db import SQLITE_PRAGMAS, create_hotel_engine
+
+START_DATE = datetime.date(2025, 1, 1)
+
+# Синтетична база: кімнати та бронювання, рівномірно розкидані на кілька років
+def make_database(path, rooms=2000, bookings=100_000, years=5, seed=1):
+    rnd = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade_schema(engine)
+    days = 365 * years
+    with engine.begin() as conn:
+        conn.execute(insert(RoomType), [
+            {"id": 1, "type": "Стандарт", "price": 50, "max_guests": 2},
+            {"id": 2, "type": "Люкс", "price": 150, "max_guests": 4},
+            {"id": 3, "type": "Апартаменти", "price": 300, "max_guests": 6},
+        ])
+        conn.execute(insert(Room), [
+            {"id": i, "type_id": i % 3 + 1, "status": RoomStatus.Вільний, "price_per_night": 50}
+            for i in range(1, rooms + 1)
+        ])
+        batch = []
+        for i in range(bookings):
+            check_in = START_DATE + datetime.timedelta(days=rnd.randrange(days))
+            batch.append({
+                "guest_id": rnd.randint(1, 10_000),
+                "room_id": rnd.randint(1, rooms),
+                "check_in": check_in,
+                "check_out": check_in + datetime.timedelta(days=rnd.randint(1, 14)),
+                "status": BookingStatus.Активно if rnd.random() < 0.9 else BookingStatus.Скасовано,
+                "price_per_night": 50,
+            })
+            if len(batch) == 50_000:
+                conn.execute(insert(Booking), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Booking), batch)
+        rebuild_room_nights(conn)
+    return engine
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+# Затримка перевірки перетину бронювань (як у add_booking) з індексами та без
+def bench_overlap(args):
+    for count in args.bookings:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_database(os.path.join(tmp, "bench.db"), rooms=args.rooms, bookings=count)
+            session = sessionmaker(bind=engine)()
+            rnd = random.Random(2)
+
+            def overlap_check():
+                check_in = START_DATE + datetime.timedelta(days=rnd.randrange(365 * 5))
+                session.query(Booking).filter(
+                    Booking.room_id == rnd.randint(1, args.rooms),
+                    Booking.status == BookingStatus.Активно,
+                    Booking.check_out > check_in,
+                    Booking.check_in < check_in + datetime.timedelta(days=3)
+                ).count()
+
+            with_index = timed(overlap_check, args.repeat)
+            with engine.begin() as conn:
+                conn.execute(text("DROP INDEX ix_booking_availability"))
+            without_index = timed(overlap_check, args.repeat)
+            session.close()
+            engine.dispose()
+            print(f"{count} бронювань: з індексом {with_index:.3f} мс, без індексу {without_index:.3f} мс")
+
+# Затримка GET /availability на синтетичних даних (за замовчуванням 2000 кімнат, 5 років)
+def bench_search(args):
+    from fastapi.testclient import TestClient
+    import hotel.lab5 as lab5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_database(path, rooms=args.rooms, bookings=args.bookings, years=5)
+        db.configure(f"sqlite:///{path}")
+        client = TestClient(lab5.app)
+        rnd = random.Random(4)
+
+        def search():
+            check_in = START_DATE + datetime.timedelta(days=rnd.randrange(365 * 5))
+            response = client.get("/availability", params={
+                "check_in": check_in.isoformat(),
+                "check_out": (check_in + datetime.timedelta(days=rnd.randint(1, 14))).isoformat(),
+                "guests": rnd.randint(1, 3),
+            })
+            assert response.status_code == 200
+
+        print(f"GET /availability ({args.rooms} кімнат, {args.bookings} бронювань): {timed(search, args.repeat):.2f} мс")
+        engine.dispose()
+        db.configure()
+
+# Курсорна пагінація GET /guest/: затримка сторінки на початку, в середині та в кінці таблиці
+def bench_pages(args):
+    from fastapi.testclient import TestClient
+    import hotel.lab5 as lab5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        upgrade_schema(engine)
+        with engine.begin() as conn:
+            for start in range(0, args.rows, 100_000):
+                conn.execute(insert(Guest), [
+                    {"name": f"Гість {i}", "age": 20 + i % 60, "phone": str(i), "email": f"g{i}@mail.com", "passport": str(i)}
+                    for i in range(start, min(start + 100_000, args.rows))
+                ])
+        db.configure(f"sqlite:///{path}")
+        client = TestClient(lab5.app)
+        session = db.SessionLocal()
+        for after_id in [0, args.rows // 2, args.rows - args.limit]:
+            keyset = timed(lambda: client.get("/guest/", params={"after_id": after_id, "limit": args.limit}), args.repeat)
+            projected = timed(lambda: client.get("/guest/", params={"after_id": after_id, "limit": args.limit,
+                                                                   "fields": "id,name"}), args.repeat)
+            offset = timed(lambda: session.query(Guest).order_by(Guest.id).offset(after_id).limit(args.limit).all(),
+                           args.repeat)
+            print(f"після ID {after_id}: курсор {keyset:.2f} мс, курсор + fields {projected:.2f} мс, "
+                  f"OFFSET (лише запит) {offset:.2f} мс")
+        session.close()
+        engine.dispose()
+        db.configure()
+
+# Потоковий експорт: час до першої порції, загальний час і пік пам'яті генератора відповіді
+def bench_export(args):
+    import tracemalloc
+    import hotel.lab5 as lab5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_database(path, rooms=args.rooms, bookings=args.bookings)
+        db.configure(f"sqlite:///{path}")
+        for name, stream in [("ndjson", lab5.ndjson_stream), ("csv", lab5.csv_stream)]:
+            for measure_memory in [False, True]:
+                if measure_memory:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                first_chunk, size = None, 0
+                for chunk in stream(lab5.BOOKING_READ_COLUMNS, lab5.export_rows(
+                        lab5.BOOKING_READ_COLUMNS, Booking.id, lab5.BOOKING_EXPORT_JOINS)):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - started
+                    size += len(chunk.encode())
+                total = time.perf_counter() - started
+                if measure_memory:
+                    print(f"  пік пам'яті {tracemalloc.get_traced_memory()[1] / 2**20:.1f} МБ")
+                    tracemalloc.stop()
+                else:
+                    print(f"bookings.{name} ({args.bookings} рядків, {size / 2**20:.1f} МБ): "
+                          f"перша порція {first_chunk * 1000:.1f} мс, усього {total:.2f} с")
+        engine.dispose()
+        db.configure()
+
+# Рахунок для гостя з тисячами записів послуг: цикл із запитом на кожен запис проти одного агрегату
+def bench_invoice(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_database(os.path.join(tmp, "bench.db"), rooms=100, bookings=1000)
+        rnd = random.Random(5)
+        with engine.begin() as conn:
+            conn.execute(insert(Service), [{"id": i, "name": f"Послуга {i}", "price": 10 * i} for i in range(1, 51)])
+            conn.execute(insert(GuestService), [
+                {"guest_id": 1, "service_id": rnd.randint(1, 50),
+                 "date": START_DATE + datetime.timedelta(days=rnd.randrange(365 * 5))}
+                for _ in range(args.services)
+            ])
+        session = sessionmaker(bind=engine)()
+        booking = Booking(id=0, guest_id=1, check_in=START_DATE, check_out=START_DATE + datetime.timedelta(days=60),
+                          price_per_night=50)
+
+        def per_row():
+            total = 0
+            for gs in session.query(GuestService).filter_by(guest_id=booking.guest_id).all():
+                service = session.get(Service, gs.service_id)
+                if service:
+                    total += service.price
+            session.expire_all()
+
+        def aggregate():
+            compute_invoice(session, booking)
+
+        print(f"{args.services} записів послуг гостя: запит на кожен запис {timed(per_row, 5):.1f} мс, "
+              f"агрегатний рахунок {timed(aggregate, args.repeat):.3f} мс")
+        session.close()
+        engine.dispose()
+
+# Навантаження GET /guest/ від 200 одночасних клієнтів: асинхронний ендпоінт проти такого самого синхронного
+def serve_api(path, port):
+    import uvicorn
+    from fastapi import Depends
+    import hotel.lab5 as lab5
+
+    db.configure(f"sqlite:///{path}")
+
+    @lab5.app.get("/bench/sync/guest/")
+    def sync_guests(page: lab5.PageParams = Depends(), session=Depends(db.get_db)):
+        return lab5.keyset_page(session.query(*lab5.select_fields(lab5.GUEST_COLUMNS, page)), Guest.id, page, lab5.GuestOut)
+
+    uvicorn.run(lab5.app, port=port, log_level="warning")
+
+async def load(url, clients, requests_per_client, rows):
+    import asyncio
+    import httpx
+
+    rnd = random.Random(6)
+    latencies, errors = [], 0
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=clients), timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            for _ in range(requests_per_client):
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url, params={"after_id": rnd.randrange(rows), "limit": 20})
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(clients)])
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else float("nan")
+    return len(latencies) / elapsed, p95, errors
+
+def bench_async(args):
+    import asyncio
+    import multiprocessing
+    import httpx
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        upgrade_schema(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Guest), [
+                {"name": f"Гість {i}", "age": 20 + i % 60, "phone": str(i), "email": f"g{i}@mail.com", "passport": str(i)}
+                for i in range(args.rows)
+            ])
+        engine.dispose()
+        server = multiprocessing.Process(target=serve_api, args=(path, args.port), daemon=True)
+        server.start()
+        base = f"http://127.0.0.1:{args.port}"
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/guest/", params={"limit": 1})
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        try:
+            for name, url in [("sync", "/bench/sync/guest/"), ("async", "/guest/")]:
+                asyncio.run(load(base + url, args.clients, 1, args.rows))
+                throughput, p95, errors = asyncio.run(load(base + url, args.clients, args.requests, args.rows))
+                print(f"{name}: {args.clients} клієнтів, {throughput:.0f} запитів/с, p95 {p95:.0f} мс, помилок {errors}")
+        finally:
+            server.terminate()
+            server.join()
+
+# Змішане навантаження на один файл бази: потоки читання (рахунки) та запису (послуги гостей)
+# з типовими налаштуваннями SQLite і з профілем PRAGMA
+def bench_pragmas(args):
+    import threading
+    from sqlalchemy.exc import OperationalError
+
+    for name, pragmas in [("типові PRAGMA", {}), ("профіль PRAGMA", SQLITE_PRAGMAS)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            make_database(path, rooms=200, bookings=20_000).dispose()
+            engine = create_hotel_engine(f"sqlite:///{path}", pragmas=pragmas, pool_size=args.readers + args.writers,
+                                         connect_args={"timeout": args.timeout})
+            with engine.begin() as conn:
+                conn.execute(insert(Service), [{"id": i, "name": f"Послуга {i}", "price": 10 * i} for i in range(1, 21)])
+            Session = sessionmaker(bind=engine)
+            counts = {"read": 0, "write": 0, "locked": 0}
+            lock = threading.Lock()
+            stop = time.perf_counter() + args.seconds
+
+            def count(key):
+                with lock:
+                    counts[key] += 1
+
+            def reader(seed):
+                rnd = random.Random(seed)
+                with Session() as session:
+                    while time.perf_counter() < stop:
+                        try:
+                            compute_invoice(session, session.get(Booking, rnd.randint(1, 20_000)))
+                            session.rollback()
+                            count("read")
+                        except OperationalError:
+                            session.rollback()
+                            count("locked")
+
+            def writer(seed):
+                rnd = random.Random(seed)
+                with Session() as session:
+                    while time.perf_counter() < stop:
+                        try:
+                            session.add(GuestService(guest_id=rnd.randint(1, 10_000), service_id=rnd.randint(1, 20),
+                                                     date=START_DATE + datetime.timedelta(days=rnd.randrange(365 * 5))))
+                            session.commit()
+                            count("write")
+                        except OperationalError:
+                            session.rollback()
+                            count("locked")
+
+            threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+            threads += [threading.Thread(target=writer, args=(100 + i,)) for i in range(args.writers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            engine.dispose()
+            print(f"{name}: читання {counts['read'] / args.seconds:.0f}/с, запис {counts['write'] / args.seconds:.0f}/с, "
+                  f"помилок блокування {counts['locked']}")
+
+# Групове бронювання: послідовні POST /bookings/ проти одного POST /bookings/bulk на копіях тієї самої бази
+def bench_bulk(args):
+    import shutil
+    from fastapi.testclient import TestClient
+    import hotel.lab5 as lab5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = make_database(path, rooms=args.rooms, bookings=args.bookings)
+        with engine.begin() as conn:
+            conn.execute(insert(Guest), [
+                {"id": i, "name": f"Гість {i}", "age": 30, "phone": str(i), "email": f"g{i}@mail.com", "passport": str(i)}
+                for i in range(1, 1001)
+            ])
+        engine.dispose()
+        rnd = random.Random(7)
+        items = []
+        for _ in range(args.items):
+            check_in = START_DATE + datetime.timedelta(days=rnd.randrange(365))
+            items.append({"guest_id": rnd.randint(1, 1000), "room_id": rnd.randint(1, args.rooms),
+                          "check_in": check_in.isoformat(),
+                          "check_out": (check_in + datetime.timedelta(days=rnd.randint(1, 7))).isoformat()})
+
+        results = {}
+        for name in ("sequential", "bulk"):
+            copy = os.path.join(tmp, f"{name}.db")
+            shutil.copy(path, copy)
+            db.configure(f"sqlite:///{copy}")
+            client = TestClient(lab5.app)
+            client.get("/bookings/1/invoice")  # прогрів: з'єднання з базою і компіляція запитів
+            started = time.perf_counter()
+            if name == "sequential":
+                created = sum(client.post("/bookings/", json=item).status_code == 200 for item in items)
+            else:
+                created = client.post("/bookings/bulk", json={"items": items, "mode": "best_effort"}).json()["created"]
+            results[name] = ((time.perf_counter() - started) * 1000, created)
+            db.configure()
+
+        (sequential_ms, sequential_created), (bulk_ms, bulk_created) = results["sequential"], results["bulk"]
+        print(f"{args.items} бронювань: послідовно {sequential_ms:.0f} мс (створено {sequential_created}), "
+              f"пакетом {bulk_ms:.0f} мс (створено {bulk_created}), прискорення {sequential_ms / bulk_ms:.0f}x")
+
+# Запис журналу заселень: save_to_file з lab3 (три відкриття файлу на заселення) проти GuestLogWriter
+def bench_guest_log(args):
+    from hotel import lab3
+    from hotel.guest_log import GuestLogWriter, GuestRecord
+
+    record = GuestRecord(name="Олег Кому Григорович", age=23, phone="1241241241", passport="32510",
+                         room_type="Стандарт", check_in=datetime.date(2025, 4, 24),
+                         check_out=datetime.date(2025, 4, 30), amount=300, method="готівка")
+    guest, booking, payment = record.to_text().split("\n\n")
+    guest, booking = guest + "\n\n", booking + "\n\n"
+
+    def save_to_file(path):
+        for _ in range(args.records):
+            lab3.save_to_file(guest, path)
+            lab3.save_to_file(booking, path)
+            lab3.save_to_file(payment, path)
+
+    def writer(**policy):
+        def run(path):
+            with GuestLogWriter(path, **policy) as log:
+                for _ in range(args.records):
+                    log.write_record(record)
+        return run
+
+    variants = [
+        ("save_to_file (3 відкриття на запис)", save_to_file),
+        ("GuestLogWriter, скидання кожного запису", writer()),
+        ("GuestLogWriter, партії по 100 записів", writer(flush_records=100)),
+        ("GuestLogWriter, партії по 100 + fsync", writer(flush_records=100, fsync="flush")),
+    ]
+    if args.fsync_each:
+        variants.append(("GuestLogWriter, fsync кожного запису", writer(fsync="flush")))
+    with tempfile.TemporaryDirectory() as tmp:
+        for number, (name, run) in enumerate(variants):
+            path = os.path.join(tmp, f"guest_data_{number}.txt")
+            started = time.perf_counter()
+            run(path)
+            seconds = time.perf_counter() - started
+            print(f"{name}: {args.records / seconds:,.0f} записів/с")
+
+# Пошук записів гостя в журналі: повний перегляд файлу проти seek за індексом-супутником.
+# Окремо — разове завантаження індексу при відкритті журналу
+def bench_guest_lookup(args):
+    from hotel import guest_log
+
+    def record(number):
+        return guest_log.GuestRecord(name=f"Гість {number}", age=30, phone=f"+380{number:09d}",
+                                     passport=f"АА{number:06d}", room_type="Стандарт",
+                                     check_in=datetime.date(2025, 4, 24), check_out=datetime.date(2025, 4, 30),
+                                     amount=300, method="готівка")
+
+    wanted = [f"АА{random.randrange(args.guests):06d}" for _ in range(args.lookups)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in guest_log.FORMATS:
+            path = os.path.join(tmp, "guest_data.jsonl" if fmt == "jsonl" else "guest_data.txt")
+            with guest_log.GuestLogWriter(path, flush_records=1000, fmt=fmt, index=True) as log:
+                for number in range(args.records):
+                    log.write_record(record(number % args.guests))
+
+            started = time.perf_counter()
+            for passport in wanted[:args.scans]:
+                with open(path, "rb") as stream:
+                    found = [entry.record for entry in guest_log.read_log_entries(stream, fmt)
+                             if entry.record and entry.record.passport == passport]
+            scan = (time.perf_counter() - started) / args.scans
+
+            started = time.perf_counter()
+            log = guest_log.GuestLog(path)
+            opened = time.perf_counter() - started
+            started = time.perf_counter()
+            for passport in wanted:
+                found = log.lookup(passport)
+            indexed = (time.perf_counter() - started) / len(wanted)
+            assert len(found) == args.records // args.guests
+            print(f"{fmt}: {args.records} записів, повний перегляд {scan * 1000:.1f} мс, "
+                  f"за індексом {indexed * 1000:.3f} мс (x{scan / indexed:.0f}), завантаження індексу {opened * 1000:.0f} мс")
+
+# Перегляд великого журналу lab3: read() усього файлу, построкове читання і mmap.
+# Кожен варіант — в окремому процесі, пікова пам'ять (ru_maxrss) — зверх пам'яті інтерпретатора
+SCAN_SCRIPT = """
+import resource, sys, time
+from hotel import guest_log
+reader, path = sys.argv[1:]
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+if reader == "read":
+    with open(path, encoding="utf-8") as file:
+        blocks = file.read().split(guest_log.SEPARATOR + "\\n")[:-1]
+    count = sum(1 for block in blocks if guest_log.parse_record(block))
+elif reader == "stream":
+    with open(path, "rb") as stream:
+        count = sum(1 for entry in guest_log.read_entries(stream) if entry.record)
+else:
+    count = sum(1 for record in guest_log.map_records(path))
+seconds = time.perf_counter() - started
+print(count, seconds, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024)
+"""
+
+def bench_guest_scan(args):
+    import subprocess
+    import sys
+    from hotel.guest_log import GuestLogWriter, GuestRecord
+
+    record = GuestRecord(name="Олег Кому Григорович", age=23, phone="1241241241", passport="32510",
+                         room_type="Стандарт", check_in=datetime.date(2025, 4, 24),
+                         check_out=datetime.date(2025, 4, 30), amount=300, method="готівка")
+    block = record.to_text()
+    records = args.megabytes * 1024 * 1024 // len(block.encode())
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "guest_data.txt")
+        with GuestLogWriter(path) as log:
+            for _ in range(records // 1000):
+                log.write(block * 1000)
+        print(f"журнал: {os.path.getsize(path) / 1024 / 1024:.0f} МБ, {records // 1000 * 1000} записів")
+        for reader, name in [("read", "open().read() + split"), ("stream", "read_entries (построково)"),
+                             ("mmap", "map_records (mmap)")]:
+            result = subprocess.run([sys.executable, "-c", SCAN_SCRIPT, reader, path],
+                                    env=env, capture_output=True, text=True, check=True)
+            count, seconds, memory = result.stdout.split()
+            print(f"{name}: {int(count) / float(seconds):,.0f} записів/с, пам'ять +{float(memory):.0f} МБ")
+
+# Ущільнення журналу: розмір на диску і час перегляду до та після (з постійними гостями)
+def bench_guest_compact(args):
+    from hotel import compaction, guest_log
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "guest_data.txt")
+        with guest_log.GuestLogWriter(source, flush_records=1000) as log:
+            for _ in range(args.records):
+                number = random.randrange(args.guests)
+                check_in = datetime.date(2020, 1, 1) + datetime.timedelta(days=random.randrange(2000))
+                log.write_record(guest_log.GuestRecord(
+                    name=f"Гість Номер {number} Тестовий", age=30, phone=f"+380{number:09d}",
+                    passport=f"АА{number:06d}", room_type="Стандарт", check_in=check_in,
+                    check_out=check_in + datetime.timedelta(days=3), amount=300, method="готівка"))
+        started = time.perf_counter()
+        count = sum(1 for _ in guest_log.map_records(source))
+        scan = time.perf_counter() - started
+        print(f"журнал: {os.path.getsize(source) / 1024 / 1024:.1f} МБ, перегляд {count} записів {scan:.2f} с")
+        for compress in (False, True):
+            directory = os.path.join(tmp, f"archive-{compress}")
+            started = time.perf_counter()
+            report = compaction.compact(source, directory, args.segment_mb * 1024 * 1024, compress)
+            seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            count = sum(1 for _ in compaction.read_compacted(directory))
+            print(f"{'gzip' if compress else 'jsonl'}: ущільнення {seconds:.2f} с, "
+                  f"{report.compacted_bytes / 1024 / 1024:.1f} МБ у {report.segments} сегментах "
+                  f"(x{report.source_bytes / report.compacted_bytes:.1f} менше), "
+                  f"перегляд {count} записів {time.perf_counter() - started:.2f} с")
+
+# Консольний застосунок lab1: пошук неоплачених бронювань гостя переглядом списку
+# (як було в payment_menu / show_services) проти індексів BookingStore
+def bench_lab1(args):
+    from hotel.lab1 import BookingStore
+
+    store = BookingStore()
+    check_in = datetime.datetime(2025, 6, 1)
+    for number in range(args.bookings):
+        store.add(f"Гість {number % args.guests}", number % 1000, check_in, check_in + datetime.timedelta(days=3))
+    bookings = store.bookings
+    names = [f"Гість {random.randrange(args.guests)}" for _ in range(args.repeat)]
+
+    started = time.perf_counter()
+    for name in names:
+        found = [b for b in bookings if b["name"] == name and not b["paid"]]
+        next((b for b in bookings if b["name"] == name and not b["paid"]), None)
+    scan = (time.perf_counter() - started) / len(names)
+
+    started = time.perf_counter()
+    for name in names:
+        indexed = store.unpaid_for(name)
+        store.first_unpaid(name)
+    lookup = (time.perf_counter() - started) / len(names)
+    assert indexed == [b for b in bookings if b["name"] == name and not b["paid"]]
+    print(f"{args.bookings} бронювань: перегляд списку {scan * 1e3:.2f} мс, "
+          f"BookingStore {lookup * 1e6:.1f} мкс (x{scan / lookup:.0f})")
+
+# Час старту API: імпорт модуля (python -X importtime) і час до першої відповіді в новому процесі.
+# Перевищення порогів завершує бенчмарк з кодом 1, тож його можна запускати як перевірку регресій
+FIRST_RESPONSE_SCRIPT = """
+import time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+import hotel.lab5 as lab5
+with TestClient(lab5.create_app()) as client:
+    assert client.get("/guest/", params={"limit": 1}).status_code == 200
+print((time.perf_counter() - started) * 1000)
+"""
+
+def bench_startup(args):
+    import subprocess
+    import sys
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        make_database(path, rooms=200, bookings=args.bookings).dispose()
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path), "PYTHONWARNINGS": "ignore",
+               "HOTEL_DATABASE_URL": f"sqlite:///{path}"}
+
+        imports = []
+        for _ in range(args.repeat):
+            result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import hotel.lab5"],
+                                    env=env, capture_output=True, text=True, check=True)
+            modules = {}
+            for line in result.stderr.splitlines():
+                if line.startswith("import time:") and "|" in line:
+                    _, cumulative, name = line[len("import time:"):].split("|")
+                    if cumulative.strip().isdigit():
+                        modules[name.strip()] = int(cumulative) / 1000
+            imports.append(modules)
+        import_ms = min(modules["hotel.lab5"] for modules in imports)
+        slowest = sorted(((ms, name) for name, ms in imports[0].items() if name.count(".") == 0), reverse=True)[:5]
+        print(f"import hotel.lab5: {import_ms:.0f} мс (найповільніші пакети: "
+              + ", ".join(f"{name} {ms:.0f} мс" for ms, name in slowest) + ")")
+
+        first_responses = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", FIRST_RESPONSE_SCRIPT],
+                                    env=env, capture_output=True, text=True, check=True)
+            first_responses.append(((time.perf_counter() - started) * 1000, float(result.stdout.split()[-1])))
+        process_ms, app_ms = min(first_responses)
+        print(f"перша відповідь: {process_ms:.0f} мс від запуску процесу, {app_ms:.0f} мс після старту інтерпретатора "
+              f"({args.bookings} бронювань в індексі)")
+
+    failed = []
+    if args.max_import_ms and import_ms > args.max_import_ms:
+        failed.append(f"імпорт {import_ms:.0f} мс > {args.max_import_ms} мс")
+    if args.max_first_response_ms and process_ms > args.max_first_response_ms:
+        failed.append(f"перша відповідь {process_ms:.0f} мс > {args.max_first_response_ms} мс")
+    if failed:
+        print("Перевищено поріг: " + "; ".join(failed))
+        raise SystemExit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки системи управління готелем")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    overlap = commands.add_parser("overlap", help="перевірка перетину бронювань")
+    overlap.add_argument("--bookings", type=int, nargs="+", default=[100_000, 1_000_000])
+    overlap.add_argument("--rooms", type=int, default=2000)
+    overlap.add_argument("--repeat", type=int, default=200)
+    overlap.set_defaults(func=bench_overlap)
+
+    search = commands.add_parser("search", help="пошук вільних кімнат через API")
+    search.add_argument("--bookings", type=int, default=300_000)
+    search.add_argument("--rooms", type=int, default=2000)
+    search.add_argument("--repeat", type=int, default=50)
+    search.set_defaults(func=bench_search)
+
+    pages = commands.add_parser("pages", help="курсорна пагінація списків API")
+    pages.add_argument("--rows", type=int, default=1_000_000)
+    pages.add_argument("--limit", type=int, default=100)
+    pages.add_argument("--repeat", type=int, default=50)
+    pages.set_defaults(func=bench_pages)
+
+    export = commands.add_parser("export", help="потоковий експорт бронювань")
+    export.add_argument("--bookings", type=int, default=300_000)
+    export.add_argument("--rooms", type=int, default=2000)
+    export.set_defaults(func=bench_export)
+
+    invoice = commands.add_parser("invoice", help="розрахунок рахунку за бронювання")
+    invoice.add_argument("--services", type=int, default=5000)
+    invoice.add_argument("--repeat", type=int, default=200)
+    invoice.set_defaults(func=bench_invoice)
+
+    concurrency = commands.add_parser("async", help="пропускна здатність sync і async ендпоінтів")
+    concurrency.add_argument("--clients", type=int, default=200)
+    concurrency.add_argument("--requests", type=int, default=20)
+    concurrency.add_argument("--rows", type=int, default=10_000)
+    concurrency.add_argument("--port", type=int, default=8765)
+    concurrency.set_defaults(func=bench_async)
+
+    pragmas = commands.add_parser("pragmas", help="змішане читання/запис з профілем PRAGMA і без")
+    pragmas.add_argument("--readers", type=int, default=4)
+    pragmas.add_argument("--writers", type=int, default=4)
+    pragmas.add_argument("--seconds", type=float, default=5)
+    pragmas.add_argument("--timeout", type=float, default=0, help="timeout драйвера sqlite3 у секундах")
+    pragmas.set_defaults(func=bench_pragmas)
+
+    bulk = commands.add_parser("bulk", help="групове бронювання проти послідовних запитів")
+    bulk.add_argument("--items", type=int, default=300)
+    bulk.add_argument("--rooms", type=int, default=2000)
+    bulk.add_argument("--bookings", type=int, default=100_000)
+    bulk.set_defaults(func=bench_bulk)
+
+    guest_log = commands.add_parser("guest-log", help="запис журналу заселень lab3")
+    guest_log.add_argument("--records", type=int, default=50_000)
+    guest_log.add_argument("--fsync-each", action="store_true", help="також fsync після кожного запису")
+    guest_log.set_defaults(func=bench_guest_log)
+
+    lookup = commands.add_parser("guest-lookup", help="пошук гостя в журналі: перегляд проти індексу")
+    lookup.add_argument("--records", type=int, default=100_000)
+    lookup.add_argument("--guests", type=int, default=20_000)
+    lookup.add_argument("--lookups", type=int, default=1000)
+    lookup.add_argument("--scans", type=int, default=3)
+    lookup.set_defaults(func=bench_guest_lookup)
+
+    scan = commands.add_parser("guest-scan", help="перегляд великого журналу заселень: read, построково, mmap")
+    scan.add_argument("--megabytes", type=int, default=200)
+    scan.set_defaults(func=bench_guest_scan)
+
+    compact = commands.add_parser("guest-compact", help="ущільнення журналу заселень у гостей і сегменти")
+    compact.add_argument("--records", type=int, default=200_000)
+    compact.add_argument("--guests", type=int, default=20_000)
+    compact.add_argument("--segment-mb", type=int, default=8)
+    compact.set_defaults(func=bench_guest_compact)
+
+    console = commands.add_parser("lab1", help="пошук бронювань гостя в консольному застосунку lab1")
+    console.add_argument("--bookings", type=int, default=100_000)
+    console.add_argument("--guests", type=int, default=20_000)
+    console.add_argument("--repeat", type=int, default=200)
+    console.set_defaults(func=bench_lab1)
+
+    startup = commands.add_parser("startup", help="час імпорту та першої відповіді API (поріг регресії)")
+    startup.add_argument("--bookings", type=int, default=10_000)
+    startup.add_argument("--repeat", type=int, default=3)
+    startup.add_argument("--max-import-ms", type=float, default=1500)
+    startup.add_argument("--max-first-response-ms", type=float, default=4000)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import datetime
+import gzip
+import json
+import os
+from dataclasses import dataclass
+from hotel import guest_log
+
+# Ущільнення журналу lab3 (guest_data.txt). Дані гостя (ПІБ, вік, телефон) повторюються в кожному
+# заселенні, тож вони виносяться в таблицю гостей guests.jsonl — один рядок на кожен різний набір
+# даних гостя (постійний гість, що змінив телефон, має два рядки), а заселення посилаються на
+# нього за id. Заселення й оплати переписуються в сегменти stays-00001.jsonl[.gz] обмеженого
+# розміру (до стиснення); наступний запис, що не вміщується, починає новий сегмент.
+# manifest.json містить список сегментів і зсув у вихідному журналі, до якого його оброблено:
+# повторний запуск дописує лише нові записи в нові сегменти. Маніфест записується останнім,
+# тож перерваний запуск не псує вже ущільнені дані.
+# Без rotate вихідний журнал не змінюється — lab3 може дописувати його під час ущільнення,
+# але файл росте без меж. З rotate журнал перейменовується (guest_data.txt.<час>), lab3 при
+# наступному записі створює новий, а перейменований файл ущільнюється і видаляється
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+MANIFEST = "manifest.json"
+GUESTS = "guests.jsonl"
+
+@dataclass
+class CompactionReport:
+    records: int = 0
+    failed: int = 0
+    guests: int = 0
+    segments: int = 0
+    source_bytes: int = 0
+    compacted_bytes: int = 0
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"offset": 0, "records": 0, "segments": []}
+
+def write_json_atomic(path, write):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, path)
+
+def write_manifest(directory, manifest):
+    write_json_atomic(os.path.join(directory, MANIFEST), lambda file: json.dump(manifest, file, ensure_ascii=False))
+
+# {id: дані гостя}
+def read_guests(directory):
+    guests = {}
+    try:
+        with open(os.path.join(directory, GUESTS), encoding="utf-8") as file:
+            for line in file:
+                guest = json.loads(line)
+                guests[guest["id"]] = guest
+    except FileNotFoundError:
+        pass
+    return guests
+
+def open_segment(path):
+    return gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz") else open(path, "w", encoding="utf-8")
+
+# Перейменування журналу перед ущільненням. Ім'я записується в маніфест до перейменування:
+# якщо запуск перервано, наступний дочищає той самий файл, а якщо файлу з цим ім'ям немає —
+# перейменування не відбулося і зсув маніфесту досі стосується вихідного журналу.
+# Незавершений ротований файл дочищається першим навіть без rotate
+def rotated_source(source, directory, manifest, rotate):
+    folder = os.path.dirname(source)
+    if manifest.get("rotated"):
+        path = os.path.join(folder, manifest["rotated"])
+        if os.path.exists(path):
+            return path
+        manifest["rotated"] = None
+    if not rotate or not os.path.exists(source):
+        return None
+    manifest["rotated"] = f"{os.path.basename(source)}.{datetime.datetime.now():%Y%m%d%H%M%S%f}"
+    write_manifest(directory, manifest)
+    path = os.path.join(folder, manifest["rotated"])
+    os.rename(source, path)
+    return path
+
+def compact(source, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, compress=False, rotate=False):
+    os.makedirs(directory, exist_ok=True)
+    source = os.fspath(source)
+    manifest = read_manifest(directory)
+    guests = read_guests(directory)
+    guest_ids = {(g["passport"], g["name"], g["age"], g["phone"]): guest_id for guest_id, g in guests.items()}
+    report = CompactionReport()
+    segments = manifest["segments"]
+    segment = path = None
+    written = 0
+    rotated = rotated_source(source, directory, manifest, rotate)
+    offset = start = manifest["offset"]
+
+    def close_segment():
+        segment.close()
+        segments.append(os.path.basename(path))
+
+    for entry in guest_log.map_entries(rotated or source, offset):
+        offset = entry.end
+        if entry.error:
+            report.failed += 1
+            continue
+        record = entry.record
+        key = (record.passport, record.name, record.age, record.phone)
+        if key not in guest_ids:
+            guest_ids[key] = len(guests) + 1
+            guests[guest_ids[key]] = {"id": guest_ids[key], "passport": record.passport, "name": record.name,
+                                      "age": record.age, "phone": record.phone}
+        line = json.dumps({"guest": guest_ids[key], "room_type": record.room_type,
+                           "check_in": record.check_in.isoformat(), "check_out": record.check_out.isoformat(),
+                           "amount": record.amount, "method": record.method}, ensure_ascii=False) + "\n"
+        size = len(line.encode("utf-8"))
+        if segment is not None and written + size > segment_bytes:
+            close_segment()
+            segment = None
+        if segment is None:
+            path = os.path.join(directory, f"stays-{len(segments) + 1:05d}.jsonl" + (".gz" if compress else ""))
+            segment = open_segment(path)
+            written = 0
+        segment.write(line)
+        written += size
+        report.records += 1
+    if segment is not None:
+        close_segment()
+
+    write_json_atomic(os.path.join(directory, GUESTS), lambda file: file.writelines(
+        json.dumps(guest, ensure_ascii=False) + "\n" for guest in guests.values()))
+    source_bytes = manifest.get("source_bytes", start) + offset - start
+    manifest.update(offset=offset, records=manifest["records"] + report.records, source_bytes=source_bytes)
+    # Ротований файл більше не дописується: після ущільнення він видаляється, а зсув обнуляється
+    # для нового журналу. Незавершений запис у кінці (запис lab3 під час перейменування)
+    # рахується некоректним, а сам файл лишається на диску для перевірки
+    tail = rotated and os.path.getsize(rotated) > offset
+    if rotated:
+        report.failed += tail
+        manifest.update(offset=0, rotated=None)
+    write_manifest(directory, manifest)
+    if rotated and not tail:
+        os.remove(rotated)
+
+    report.guests = len(guests)
+    report.segments = len(segments)
+    report.source_bytes = source_bytes
+    report.compacted_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in [GUESTS, *segments])
+    return report
+
+# Відновлення записів журналу з ущільнених даних, у порядку заселень, з даними гостя на момент заселення
+def read_compacted(directory):
+    guests = read_guests(directory)
+    for name in read_manifest(directory)["segments"]:
+        path = os.path.join(directory, name)
+        with gzip.open(path, "rt", encoding="utf-8") if name.endswith(".gz") else open(path, encoding="utf-8") as file:
+            for line in file:
+                stay = json.loads(line)
+                guest = guests[stay["guest"]]
+                yield guest_log.GuestRecord(name=guest["name"], age=guest["age"], phone=guest["phone"],
+                                            passport=guest["passport"], room_type=stay["room_type"],
+                                            check_in=datetime.date.fromisoformat(stay["check_in"]),
+                                            check_out=datetime.date.fromisoformat(stay["check_out"]),
+                                            amount=stay["amount"], method=stay["method"])
@@ -0,0 +1,192 @@
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+# Єдине місце, де створюються з'єднання з базою. Рушії створюються ліниво, один на процес:
+# імпорт модуля нічого не відкриває, а CLI, API та інтерфейс працюють з тим самим файлом.
+# Асинхронний стек (sqlalchemy.ext.asyncio, aiosqlite) імпортується лише при першому
+# зверненні, тож CLI та інтерфейс його не завантажують
+DEFAULT_DATABASE_URL = "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "hotel_management.db")
+
+# Профіль SQLite для спільної роботи API та інтерфейсу з одним файлом бази:
+# WAL дозволяє читати під час запису, busy_timeout чекає на блокування замість
+# миттєвої помилки "database is locked"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # від'ємне значення — розмір у КБ
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+
+def apply_sqlite_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+# pysqlite сам відкриває транзакцію лише перед DML і завжди як BEGIN DEFERRED. Якщо задано опцію
+# sqlite_begin (напр. IMMEDIATE), драйвер на цю транзакцію переводиться в autocommit, а BEGIN
+# виконує SQLAlchemy. Інакше лишається звична поведінка драйвера: читання поза транзакцією
+# бачать свіжі дані, тож довгоживуча сесія (меню CLI) не тримає старий знімок бази WAL
+def use_explicit_begin(engine):
+    @event.listens_for(engine, "begin")
+    def begin(conn):
+        mode = conn.get_execution_options().get("sqlite_begin")
+        dbapi_connection = conn.connection.driver_connection
+        if mode:
+            dbapi_connection.isolation_level = None
+            conn.exec_driver_sql(f"BEGIN {mode}")
+        else:
+            dbapi_connection.isolation_level = ""
+
+def create_hotel_engine(url, pragmas=SQLITE_PRAGMAS, **kwargs):
+    engine = create_engine(url, **kwargs)
+    if engine.dialect.name == "sqlite":
+        if engine.dialect.driver == "pysqlite":
+            use_explicit_begin(engine)
+        if pragmas:
+            apply_sqlite_pragmas(engine, pragmas)
+    return engine
+
+def create_hotel_async_engine(url, pragmas=SQLITE_PRAGMAS, **kwargs):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    engine = create_async_engine(url, **kwargs)
+    if engine.dialect.name == "sqlite" and pragmas:
+        apply_sqlite_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+_lock = threading.Lock()
+_url = None
+_engine = None
+_async_engine = None
+_async_session_factory = None
+
+def database_url():
+    return _url or os.environ.get("HOTEL_DATABASE_URL", DEFAULT_DATABASE_URL)
+
+def async_database_url():
+    return database_url().replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# Розмір пулу з'єднань: скільки потоків (воркерів API, сесій інтерфейсу) працюють з базою одночасно
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                url = make_url(database_url())
+                pool = {} if url.database in (None, "", ":memory:") else {"pool_size": POOL_SIZE,
+                                                                          "max_overflow": MAX_OVERFLOW}
+                _engine = create_hotel_engine(url, connect_args={"check_same_thread": False}, **pool)
+    return _engine
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                _async_engine = create_hotel_async_engine(async_database_url())
+    return _async_engine
+
+def configure(url=None):
+    """Перемикає процес на іншу базу (тести, бенчмарки); нові рушії створяться при першому запиті."""
+    global _url, _engine, _async_engine, _async_session_factory
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+        if _async_engine is not None:
+            # З'єднання aiosqlite закриваються лише в циклі подій, тут пул просто відкидається
+            _async_engine.sync_engine.dispose(close=False)
+        _url, _engine, _async_engine, _async_session_factory = url, None, None, None
+
+# Закриття пулів при зупинці застосунку; наступне звернення створить рушії знову
+async def dispose_engines():
+    global _engine, _async_engine, _async_session_factory
+    with _lock:
+        engine, async_engine = _engine, _async_engine
+        _engine, _async_engine, _async_session_factory = None, None, None
+    if engine is not None:
+        engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+# Сесії прив'язуються до рушія процесу в момент створення
+class HotelSession(Session):
+    def __init__(self, bind=None, **kwargs):
+        super().__init__(bind=bind or get_engine(), **kwargs)
+
+SessionLocal = sessionmaker(class_=HotelSession)
+
+def AsyncSessionLocal():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _async_session_factory = async_sessionmaker(bind=get_async_engine(), expire_on_commit=False)
+    return _async_session_factory()
+
+# Транзакція запису: блокування бази береться одразу на BEGIN, тому перевірка місць і вставка
+# виконуються атомарно відносно інших потоків і процесів. Викликається до першого запиту сесії
+def begin_immediate(session):
+    session.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05  # секунд, подвоюється з кожною спробою
+
+def is_busy(error):
+    orig = getattr(error, "orig", error)
+    return getattr(orig, "sqlite_errorname", "") in ("SQLITE_BUSY", "SQLITE_LOCKED") \
+        or "database is locked" in str(orig)
+
+# Повторює одиницю роботи, якщо база зайнята іншим процесом довше за busy_timeout.
+# Перед повтором сесії з аргументів відкочуються; затримка експоненційна з випадковим розкидом
+def retry_on_busy(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if attempt == BUSY_RETRIES or not is_busy(error):
+                    raise
+                for value in [*args, *kwargs.values()]:
+                    if isinstance(value, Session):
+                        value.rollback()
+                time.sleep(BUSY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
+
+# Одиниця роботи: commit при успіху, rollback при помилці, сесія закривається завжди
+@contextmanager
+def session_scope():
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+# Залежності FastAPI
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,358 @@
+import datetime
+import json
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+# Журнал заселень lab3 (guest_data.txt): текстові блоки "Поле: значення", розділені рядком дефісів.
+# Структурований режим (guest_data.jsonl) — один JSON-об'єкт на заселення, з індексом-супутником
+# для пошуку за паспортом і телефоном. Модуль не залежить від бази та пакета, тож його можна
+# використовувати і з lab3.py як скрипта
+SEPARATOR = "---------------------------"
+SEPARATOR_BYTES = SEPARATOR.encode()
+FORMATS = ("text", "jsonl")
+
+FIELDS = {
+    "ПІБ": "name",
+    "Вік": "age",
+    "Телефон": "phone",
+    "Паспорт": "passport",
+    "Тип номера": "room_type",
+    "Дата заїзду": "check_in",
+    "Дата виїзду": "check_out",
+    "Сума": "amount",
+    "Спосіб оплати": "method",
+}
+
+class LogFormatError(ValueError):
+    pass
+
+@dataclass
+class GuestRecord:
+    name: str
+    age: int
+    phone: str
+    passport: str
+    room_type: str
+    check_in: datetime.date
+    check_out: datetime.date
+    amount: float
+    method: str
+
+    # Блок у форматі lab3: гість, бронювання та оплата одним текстом
+    def to_text(self):
+        return (
+            f"ПІБ: {self.name}\n"
+            f"Вік: {self.age}\n"
+            f"Телефон: {self.phone}\n"
+            f"Паспорт: {self.passport}\n"
+            "\n"
+            f"Тип номера: {self.room_type}\n"
+            f"Дата заїзду: {self.check_in}\n"
+            f"Дата виїзду: {self.check_out}\n"
+            "\n"
+            f"Сума: {self.amount:g}$\n"
+            f"Спосіб оплати: {self.method}\n"
+            f"{SEPARATOR}\n"
+        )
+
+    def to_json(self):
+        values = {**self.__dict__, "check_in": self.check_in.isoformat(), "check_out": self.check_out.isoformat()}
+        return json.dumps(values, ensure_ascii=False) + "\n"
+
+    @classmethod
+    def from_json(cls, line):
+        values = json.loads(line)
+        values["check_in"] = datetime.date.fromisoformat(values["check_in"])
+        values["check_out"] = datetime.date.fromisoformat(values["check_out"])
+        return cls(**values)
+
+    def serialize(self, fmt):
+        return self.to_json() if fmt == "jsonl" else self.to_text()
+
+def parse_record(text):
+    values = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition(":")
+        if sep and key.strip() in FIELDS:
+            values[FIELDS[key.strip()]] = value.strip()
+    missing = [key for key, name in FIELDS.items() if name not in values]
+    if missing:
+        raise LogFormatError(f"немає полів: {', '.join(missing)}")
+    try:
+        values["age"] = int(values["age"])
+        values["check_in"] = datetime.date.fromisoformat(values["check_in"])
+        values["check_out"] = datetime.date.fromisoformat(values["check_out"])
+        values["amount"] = float(values["amount"].rstrip("$").strip().replace(",", "."))
+    except ValueError as error:
+        raise LogFormatError(str(error)) from None
+    return GuestRecord(**values)
+
+@dataclass
+class LogEntry:
+    start: int  # байтовий зсув початку блоку
+    end: int    # зсув одразу після роздільника — з нього продовжується читання
+    record: Optional[GuestRecord] = None
+    error: Optional[str] = None
+
+# Потокове читання блоків з бінарного файлу, починаючи з байтового зсуву. У пам'яті лише
+# поточний блок. Незавершений блок у кінці файлу (lab3 ще дописує його) не повертається
+def read_entries(stream, offset=0):
+    stream.seek(offset)
+    start = position = offset
+    lines = []
+    for line in stream:
+        position += len(line)
+        if line.rstrip(b"\r\n") != SEPARATOR_BYTES:
+            lines.append(line)
+            continue
+        text = b"".join(lines).decode("utf-8", errors="replace")
+        lines = []
+        try:
+            yield LogEntry(start, position, record=parse_record(text))
+        except LogFormatError as error:
+            yield LogEntry(start, position, error=str(error))
+        start = position
+
+# Читання через mmap для звітів за роки журналу: роздільник шукається у відображенні файлу,
+# копіюється лише поточний блок. Переглянуті сторінки періодично віддаються ОС (MADV_DONTNEED),
+# тож пам'ять процесу не росте з розміром файлу. Записи ті самі, що й у read_entries
+MAP_RELEASE_BYTES = 64 * 1024 * 1024
+
+def _separator_end(view, position):
+    """Кінець рядка-роздільника, що починається з position, або None, якщо це не окремий рядок."""
+    end = position + len(SEPARATOR_BYTES)
+    if position and view[position - 1] != 0x0A:
+        return None
+    if end == len(view):
+        return end
+    if view[end:end + 1] == b"\n":
+        return end + 1
+    if view[end:end + 2] == b"\r\n":
+        return end + 2
+    return None
+
+def map_entries(path, offset=0):
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size <= offset:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if hasattr(view, "madvise"):
+                view.madvise(mmap.MADV_SEQUENTIAL)
+            start = search = offset
+            released = offset - offset % mmap.PAGESIZE
+            while True:
+                position = view.find(SEPARATOR_BYTES, search)
+                if position == -1:
+                    return
+                end = _separator_end(view, position)
+                if end is None:
+                    search = position + 1
+                    continue
+                text = view[start:position].decode("utf-8", errors="replace")
+                try:
+                    yield LogEntry(start, end, record=parse_record(text))
+                except LogFormatError as error:
+                    yield LogEntry(start, end, error=str(error))
+                start = search = end
+                if hasattr(view, "madvise") and start - released >= MAP_RELEASE_BYTES:
+                    boundary = start - start % mmap.PAGESIZE
+                    view.madvise(mmap.MADV_DONTNEED, released, boundary - released)
+                    released = boundary
+
+def map_records(path, offset=0):
+    return (entry.record for entry in map_entries(path, offset) if entry.record)
+
+# JSONL: рядок — запис. Незавершений останній рядок (без \n) не повертається
+def read_json_entries(stream, offset=0):
+    stream.seek(offset)
+    position = offset
+    for line in stream:
+        start, position = position, position + len(line)
+        if not line.endswith(b"\n"):
+            return
+        if not line.strip():
+            continue
+        try:
+            yield LogEntry(start, position, record=GuestRecord.from_json(line))
+        except (ValueError, TypeError, KeyError) as error:
+            yield LogEntry(start, position, error=f"некоректний запис: {error}")
+
+def detect_format(path):
+    return "jsonl" if str(path).endswith((".jsonl", ".ndjson")) else "text"
+
+def read_log_entries(stream, fmt, offset=0):
+    return read_json_entries(stream, offset) if fmt == "jsonl" else read_entries(stream, offset)
+
+# Дописування в журнал через один відкритий дескриптор. Запис заселення (або кілька записів
+# партії) потрапляє у файл одним write() з O_APPEND, тож записи кількох кіосків не
+# перемежовуються. Політика скидання: кожні flush_records записів або не пізніше ніж через
+# flush_interval секунд після першого непоскиданого запису. fsync: "never" — покладатися на
+# кеш ОС, "flush" — після кожного скидання, "close" — лише при закритті.
+# fmt — "text" (формат lab3) або "jsonl"; index=True дописує зсуви записів в індекс-супутник
+FSYNC_POLICIES = ("never", "flush", "close")
+
+class GuestLogWriter:
+    def __init__(self, path, flush_records=1, flush_interval=None, fsync="never", fmt="text", index=False):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync має бути одним з {FSYNC_POLICIES}")
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt має бути одним з {FORMATS}")
+        self.path = path
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fmt = fmt
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._index_fd = os.open(index_path(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644) if index else None
+        self._buffer = []
+        self._keys = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    # Готовий текст запису; для індексу ключі беруться з розібраного запису
+    def write(self, text, record=None):
+        if self._index_fd is not None and record is None:
+            record = parse_record(text) if self.fmt == "text" else GuestRecord.from_json(text)
+        with self._lock:
+            self._buffer.append(text.encode("utf-8"))
+            if self._index_fd is not None:
+                self._keys.append((record.passport, record.phone))
+            if len(self._buffer) >= self.flush_records:
+                self._flush()
+            elif self.flush_interval is not None and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def write_record(self, record):
+        self.write(record.serialize(self.fmt), record)
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        chunks, self._buffer = self._buffer, []
+        data = memoryview(b"".join(chunks))
+        while data:
+            data = data[os.write(self._fd, data):]
+        if self._index_fd is not None:
+            # З O_APPEND позиція дескриптора після write — кінець саме нашого запису
+            offset = os.lseek(self._fd, 0, os.SEEK_CUR) - sum(len(chunk) for chunk in chunks)
+            lines = []
+            for chunk, (passport, phone) in zip(chunks, self._keys):
+                lines.append(json.dumps([offset, len(chunk), passport, phone], ensure_ascii=False) + "\n")
+                offset += len(chunk)
+            self._keys = []
+            os.write(self._index_fd, "".join(lines).encode("utf-8"))
+        if self.fsync == "flush":
+            os.fsync(self._fd)
+
+    def close(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            self._flush()
+            if self.fsync != "never":
+                os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+            if self._index_fd is not None:
+                os.close(self._index_fd)
+                self._index_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Індекс-супутник: рядки JSON [зсув, довжина, паспорт, телефон] у файлі <журнал>.idx.
+# GuestLog завантажує його і дочитує журнал після останнього проіндексованого запису
+# (записи без індексу, дописані іншими засобами), доповнюючи індекс; повторні рядки індексу
+# для того самого зсуву ігноруються. Пошук — seek до
+# записів гостя замість перегляду всього файлу. Працює і для текстового формату lab3
+def index_path(path):
+    return f"{path}.idx"
+
+class GuestLog:
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = fmt or detect_format(path)
+        self._by_passport = {}
+        self._by_phone = {}
+        self._offsets = set()
+        self._indexed_end = 0
+        self._index_read = 0
+        self.refresh()
+
+    def _add(self, offset, length, passport, phone):
+        if offset in self._offsets:
+            return
+        self._offsets.add(offset)
+        self._by_passport.setdefault(passport, []).append((offset, length))
+        self._by_phone.setdefault(phone, []).append((offset, length))
+        self._indexed_end = max(self._indexed_end, offset + length)
+
+    def refresh(self):
+        """Підхоплює записи, дописані після попереднього завантаження."""
+        if os.path.exists(index_path(self.path)):
+            with open(index_path(self.path), "rb") as index:
+                index.seek(self._index_read)
+                for line in index:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._index_read += len(line)
+                    self._add(*json.loads(line))
+        if not os.path.exists(self.path):
+            return
+        missing = []
+        with open(self.path, "rb") as stream:
+            for entry in read_log_entries(stream, self.fmt, self._indexed_end):
+                if entry.record:
+                    missing.append([entry.start, entry.end - entry.start, entry.record.passport, entry.record.phone])
+        for item in missing:
+            self._add(*item)
+        if missing:
+            with open(index_path(self.path), "a", encoding="utf-8") as index:
+                index.write("".join(json.dumps(item, ensure_ascii=False) + "\n" for item in missing))
+
+    def _read(self, locations):
+        records = []
+        with open(self.path, "rb") as stream:
+            for offset, length in sorted(locations):
+                stream.seek(offset)
+                data = stream.read(length)
+                records.append(GuestRecord.from_json(data) if self.fmt == "jsonl"
+                               else parse_record(data.decode("utf-8")))
+        return records
+
+    def lookup(self, passport):
+        return self._read(self._by_passport.get(passport, []))
+
+    def lookup_phone(self, phone):
+        return self._read(self._by_phone.get(phone, []))
+
+# Контрольна точка: зсув, до якого журнал уже оброблено. Запис атомарний (тимчасовий файл + rename)
+def read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as file:
+            return int(file.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+def write_checkpoint(path, offset):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as file:
+        file.write(str(offset))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, path)
@@ -0,0 +1,226 @@
+import csv
+import datetime
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from hotel import guest_log
+from hotel.Lab4 import (Guest, Room, RoomType, Booking, Payment, BookingStatus, PaymentMethod, RoomStatus,
+                        book_room_nights, peak_room_nights)
+
+# Масове завантаження гостей з CSV або JSONL (один JSON-об'єкт на рядок).
+# Файл читається потоково, рядок за рядком: у пам'яті лише поточна партія для вставки.
+# Кожен рядок перевіряється схемою (GuestCreate з API), некоректні пропускаються і
+# потрапляють у звіт, коректні вставляються партіями через executemany в одній транзакції
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100  # у звіті зберігаються лише перші помилки, лічильник — усі
+FORMATS = ("csv", "jsonl")
+
+@dataclass
+class RowError:
+    line: int
+    detail: str
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    imported: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+    def add_error(self, line, detail):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(line, detail))
+
+def detect_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+    return {"ndjson": "jsonl", "json": "jsonl"}.get(extension, extension)
+
+# Текстовий потік поверх бінарного файлу (завантаження через API); BOM з Excel ігнорується
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+# Рядки файлу як (номер рядка, словник полів) або (номер рядка, текст помилки розбору)
+def read_rows(stream, fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Невідомий формат: {fmt}. Підтримуються: {', '.join(FORMATS)}")
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield line_number, f"некоректний JSON: {error.msg}"
+            continue
+        yield line_number, row if isinstance(row, dict) else "очікується JSON-об'єкт"
+
+def validation_message(error):
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+def import_guests(session, rows, schema, batch_size=DEFAULT_BATCH_SIZE):
+    """Вставляє гостей з rows (див. read_rows) партіями по batch_size. Транзакцію
+    завершує викликач: commit — імпорт цілком, rollback — жодного запису."""
+    report = ImportReport()
+    started = time.perf_counter()
+    batch = []
+    for line, row in rows:
+        report.total += 1
+        if isinstance(row, str):
+            report.add_error(line, row)
+            continue
+        if None in row:  # csv.DictReader складає значення понад заголовок під ключ None
+            report.add_error(line, f"зайві значення без заголовка: {len(row[None])}")
+            continue
+        try:
+            batch.append(schema.parse_obj(row).dict())
+        except ValidationError as error:
+            report.add_error(line, validation_message(error))
+            continue
+        if len(batch) >= batch_size:
+            session.execute(insert(Guest.__table__), batch)
+            report.imported += len(batch)
+            batch = []
+    if batch:
+        session.execute(insert(Guest.__table__), batch)
+        report.imported += len(batch)
+    report.seconds = time.perf_counter() - started
+    return report
+
+# Перенесення журналу lab3 (guest_data.txt або guest_data.jsonl) у таблиці Guest, Booking та Payment.
+# Гості зіставляються за паспортом (новий запис лише для невідомого паспорта), бронювання
+# прив'язується до першої кімнати вказаного типу, оплата датується днем заїзду.
+# Кожна партія — окрема транзакція, після неї зберігається контрольна точка (байтовий зсув),
+# тож перерваний або повторний запуск продовжує з місця зупинки. Повториться щонайбільше
+# одна партія — якщо процес зупинився між commit і записом контрольної точки
+# Заселення, що ще триває, отримує першу кімнату свого типу (не на ремонті), де на всі ночі
+# є місця — та сама перевірка peak_room_nights, що й в add_booking; завершені заселення
+# календар не займають і записуються на першу кімнату типу
+PAYMENT_METHODS = {method.value.casefold(): method for method in PaymentMethod}
+
+# {тип (casefold): ([(id кімнати, макс. гостей, чи не на ремонті)], ціна типу)}, кімнати за id
+def log_room_types(session):
+    rows = session.execute(select(RoomType.type, RoomType.price, RoomType.max_guests, Room.id, Room.status)
+                           .join(Room, Room.type_id == RoomType.id).order_by(Room.id))
+    room_types = {}
+    for room_type, price, max_guests, room_id, status in rows:
+        rooms, _ = room_types.setdefault(room_type.casefold(), ([], price))
+        rooms.append((room_id, max_guests, status != RoomStatus.На_ремонті))
+    return room_types
+
+def free_log_room(session, rooms, check_in, check_out):
+    for room_id, max_guests, available in rooms:
+        if available and peak_room_nights(session, room_id, check_in, check_out) < max_guests:
+            return room_id
+    return None
+
+def guest_ids(session, passports):
+    rows = session.execute(select(Guest.passport, func.min(Guest.id))
+                           .where(Guest.passport.in_(passports)).group_by(Guest.passport))
+    return dict(rows.all())
+
+# entries — записи журналу з партії; заселення, для яких немає вільної кімнати, потрапляють
+# у report як помилки. Повертає кількість вставлених бронювань
+def insert_log_batch(session, entries, room_types, today, report):
+    records, rooms, active = [], [], []
+    for entry in entries:
+        record = entry.record
+        type_rooms, _ = room_types[record.room_type.casefold()]
+        if record.check_out > today:
+            room_id = free_log_room(session, type_rooms, record.check_in, record.check_out)
+            if room_id is None:
+                report.add_error(entry.start, f"немає вільної кімнати типу {record.room_type} "
+                                              f"на {record.check_in}—{record.check_out}")
+                continue
+            # Ночі додаються одразу, тож наступні записи партії їх бачать
+            book_room_nights(session, room_id, record.check_in, record.check_out)
+        else:
+            room_id = type_rooms[0][0]
+        records.append(record)
+        rooms.append(room_id)
+        active.append(record.check_out > today)
+    if not records:
+        return 0
+
+    ids = guest_ids(session, {record.passport for record in records})
+    new_guests = {}
+    for record in records:
+        if record.passport not in ids:
+            new_guests.setdefault(record.passport, {"name": record.name, "age": record.age, "phone": record.phone,
+                                                    "email": None, "passport": record.passport})
+    if new_guests:
+        session.execute(insert(Guest.__table__), list(new_guests.values()))
+        ids.update(guest_ids(session, set(new_guests)))
+
+    # id нових бронювань ідуть по черзі після найбільшого: транзакція тримає блокування запису
+    last_id = session.scalar(select(func.coalesce(func.max(Booking.id), 0)))
+    bookings = []
+    for record, room_id, is_active in zip(records, rooms, active):
+        _, price = room_types[record.room_type.casefold()]
+        stay = (record.check_out - record.check_in).days
+        bookings.append({"guest_id": ids[record.passport], "room_id": room_id, "check_in": record.check_in,
+                         "check_out": record.check_out,
+                         "status": BookingStatus.Активно if is_active else BookingStatus.Завершено,
+                         "price_per_night": record.amount / stay if stay > 0 else price})
+    session.execute(insert(Booking.__table__), bookings)
+    booking_ids = session.scalars(select(Booking.id).where(Booking.id > last_id).order_by(Booking.id)).all()
+    session.execute(insert(Payment.__table__), [
+        {"booking_id": booking_id, "amount": record.amount, "date": record.check_in,
+         "method": PAYMENT_METHODS[record.method.casefold()]}
+        for record, booking_id in zip(records, booking_ids)
+    ])
+    return len(records)
+
+def import_guest_log(session, stream, checkpoint=None, batch_size=DEFAULT_BATCH_SIZE, begin=None, fmt="text"):
+    """Імпортує записи журналу з бінарного stream, починаючи з контрольної точки (файл checkpoint).
+    begin(session) викликається на початку кожної транзакції партії (напр. db.begin_immediate).
+    fmt — "text" (guest_data.txt) або "jsonl" (guest_data.jsonl)."""
+    report = ImportReport()
+    started = time.perf_counter()
+    offset = guest_log.read_checkpoint(checkpoint) if checkpoint else 0
+    room_types = log_room_types(session)
+    session.commit()
+    today = datetime.date.today()
+    batch, end = [], offset
+
+    def flush():
+        if batch:
+            if begin:
+                begin(session)
+            report.imported += insert_log_batch(session, batch, room_types, today, report)
+            batch.clear()
+        session.commit()
+        if checkpoint:
+            guest_log.write_checkpoint(checkpoint, end)
+
+    for entry in guest_log.read_log_entries(stream, fmt, offset):
+        report.total += 1
+        end = entry.end
+        record = entry.record
+        if entry.error:
+            report.add_error(entry.start, entry.error)  # для журналу замість рядка — байтовий зсув блоку
+        elif record.room_type.casefold() not in room_types:
+            report.add_error(entry.start, f"немає кімнат типу {record.room_type}")
+        elif record.method.casefold() not in PAYMENT_METHODS:
+            report.add_error(entry.start, f"невідомий спосіб оплати: {record.method}")
+        elif record.check_out < record.check_in:
+            report.add_error(entry.start, "дата виїзду раніше дати заїзду")
+        else:
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                flush()
+    flush()
+    report.seconds = time.perf_counter() - started
+    return report
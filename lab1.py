@@ -1,7 +1,6 @@
 import sys
 from datetime import datetime
 
-guests = []
 rooms = {
     101: {"type": "Стандарт", "available": True, "price": 50},
     102: {"type": "Стандарт", "available": True, "price": 50},
@@ -38,7 +37,51 @@ services = {
     "SPA": 30,
     "Транспорт": 40
 }
-bookings = []
+
+
+# Бронювання з індексами за ім'ям гостя і номером та множиною неоплачених:
+# пошук бронювань гостя і оплата не переглядають увесь список
+class BookingStore:
+    def __init__(self):
+        self.bookings = []
+        self.by_name = {}
+        self.by_room = {}
+        self.unpaid = set()
+
+    def add(self, name, room, check_in, check_out):
+        booking = {
+            "id": len(self.bookings),
+            "name": name,
+            "room": room,
+            "check_in": check_in,
+            "check_out": check_out,
+            "paid": False,
+            "services": []
+        }
+        self.bookings.append(booking)
+        self.by_name.setdefault(name, []).append(booking["id"])
+        self.by_room.setdefault(room, []).append(booking["id"])
+        self.unpaid.add(booking["id"])
+        return booking
+
+    def guest_names(self):
+        return [booking["name"] for booking in self.bookings]
+
+    def for_room(self, room):
+        return [self.bookings[i] for i in self.by_room.get(room, [])]
+
+    def unpaid_for(self, name):
+        return [self.bookings[i] for i in self.by_name.get(name, []) if i in self.unpaid]
+
+    def first_unpaid(self, name):
+        return next((self.bookings[i] for i in self.by_name.get(name, []) if i in self.unpaid), None)
+
+    def pay(self, booking):
+        booking["paid"] = True
+        self.unpaid.discard(booking["id"])
+
+
+store = BookingStore()
 
 
 def show_main_menu():
@@ -54,6 +97,7 @@ def show_main_menu():
 
 def view_guests():
     print("\n--- Список гостей ---")
+    guests = store.guest_names()
     if guests:
         for guest in guests:
             print(f"- {guest}")
@@ -84,15 +128,7 @@ def make_booking():
                 print("Дата виїзду повинна бути пізніше дати заїзду.")
                 return
 
-            guests.append(name)
-            bookings.append({
-                "name": name,
-                "room": room,
-                "check_in": date_in,
-                "check_out": date_out,
-                "paid": False,
-                "services": []
-            })
+            store.add(name, room, date_in, date_out)
             rooms[room]["available"] = False
             print(f"Номер {room} заброньовано для {name}.")
         else:
@@ -104,7 +140,7 @@ def make_booking():
 def payment_menu():
     print("\n--- Оплата ---")
     name = input("Ім'я гостя: ").strip()
-    guest_bookings = [b for b in bookings if b["name"] == name and not b["paid"]]
+    guest_bookings = store.unpaid_for(name)
 
     if not guest_bookings:
         print("Активне бронювання не знайдено або вже оплачено.")
@@ -125,8 +161,7 @@ def payment_menu():
     try:
         choice = int(input("Оберіть бронювання для оплати: ")) - 1
         if 0 <= choice < len(guest_bookings):
-            b = guest_bookings[choice]
-            b["paid"] = True
+            store.pay(guest_bookings[choice])
             print("Оплату прийнято. Дякуємо!")
         else:
             print("Невірний вибір.")
@@ -140,7 +175,7 @@ def show_services():
         print(f"{i}. {name} — {price}$")
 
     guest_name = input("Ім'я гостя: ").strip()
-    guest_booking = next((b for b in bookings if b["name"] == guest_name and not b["paid"]), None)
+    guest_booking = store.first_unpaid(guest_name)
 
     if not guest_booking:
         print("Активне бронювання не знайдено.")
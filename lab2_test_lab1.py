@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime
-from hotel.lab1 import services, rooms
+from hotel import lab1
+from hotel.lab1 import services, rooms, BookingStore
 
 def calculate_total(booking, room):
     nights = (booking["check_out"] - booking["check_in"]).days
@@ -53,4 +54,32 @@ def test_create_booking_structure():
     assert booking["name"] == "Іван"
     assert booking["room"] == 101
     assert not booking["paid"]
-    assert isinstance(booking["services"], list)
\ No newline at end of file
+    assert isinstance(booking["services"], list)
+
+def test_booking_store_indexes():
+    store = BookingStore()
+    first = store.add("Іван", 101, datetime(2025, 6, 1), datetime(2025, 6, 5))
+    store.add("Олена", 102, datetime(2025, 6, 1), datetime(2025, 6, 3))
+    second = store.add("Іван", 201, datetime(2025, 7, 1), datetime(2025, 7, 2))
+    assert store.unpaid_for("Іван") == [first, second]
+    assert store.first_unpaid("Іван") is first
+    assert store.for_room(102)[0]["name"] == "Олена"
+    assert store.guest_names() == ["Іван", "Олена", "Іван"]
+
+    store.pay(first)
+    assert first["paid"]
+    assert store.unpaid_for("Іван") == [second]
+    assert store.first_unpaid("Іван") is second
+    assert store.unpaid_for("Невідомий") == [] and store.first_unpaid("Невідомий") is None
+
+def test_payment_menu_pays_selected_booking(monkeypatch, capsys):
+    store = BookingStore()
+    monkeypatch.setattr(lab1, "store", store)
+    store.add("Іван", 101, datetime(2025, 6, 1), datetime(2025, 6, 4))
+    booking = store.add("Іван", 201, datetime(2025, 6, 1), datetime(2025, 6, 2))
+    booking["services"].append("SPA")
+    answers = iter(["Іван", "2"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    lab1.payment_menu()
+    assert "До сплати: 180$" in capsys.readouterr().out
+    assert booking["paid"] and store.unpaid == {0}
@@ -46,14 +46,28 @@ def save_to_file(data, filename):
     with open(filename, 'a', encoding='utf-8') as file:
         file.write(data)
 
+# python lab3.py --jsonl — структурований журнал guest_data.jsonl з індексом за паспортом і телефоном
 def main():
+    import sys
+    from guest_log import GuestLogWriter, LogFormatError, parse_record
+
     guest_data = get_guest_data()
     booking_data = get_booking_data()
     payment_data = get_payment_data()
+    text = guest_data + booking_data + payment_data
 
-    save_to_file(guest_data, "guest_data.txt")
-    save_to_file(booking_data, "guest_data.txt")
-    save_to_file(payment_data, "guest_data.txt")
+    # Увесь запис заселення — одним записом у файл, щоб блоки різних кіосків не перемішувались
+    if "--jsonl" not in sys.argv[1:]:
+        with GuestLogWriter("guest_data.txt") as log:
+            log.write(text)
+    else:
+        try:
+            record = parse_record(text)
+        except LogFormatError as error:
+            print(f"Помилка у введених даних: {error}")
+            return
+        with GuestLogWriter("guest_data.jsonl", fmt="jsonl", index=True) as log:
+            log.write_record(record)
 
     print("\n Всі дані успішно збережено!")
 
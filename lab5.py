@@ -1,37 +1,84 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Path
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Path, Response, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from typing import List, Optional
+from sqlalchemy import and_, func, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from typing import TYPE_CHECKING, List, Optional
 from enum import Enum
-import hotel.Lab4
+from hotel.Lab4 import (Hotel, Guest, RoomType, Room, Service, GuestService,
+                        Position, Staff, Booking, Payment, PaymentMethod,
+                        RoomNight, add_room_nights, book_room_nights, move_room_nights, peak_room_nights,
+                        compute_invoice, upgrade_schema)
+from hotel import db as database
+from hotel import importers
+from hotel.db import SessionLocal, get_db, get_async_db
+# Асинхронний стек SQLAlchemy завантажується лише при першому запиті (див. db.py)
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+import collections
 import datetime
-
-Base = declarative_base()
-
-print(dir(hotel.Lab4))
-
-app = FastAPI()
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///./hotel_management.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(bind=engine)
-Session = sessionmaker(bind=engine)
-session = Session()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+import csv
+import io
+import json
+
+# Маршрути реєструються на роутері, застосунок збирає create_app(); імпорт модуля
+# не відкриває з'єднань з базою
+router = APIRouter()
+
+# Курсорна пагінація (?after_id=&limit=) та вибір полів (?fields=) для списків
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+class PageParams:
+    def __init__(
+        self,
+        after_id: Optional[int] = Query(None, ge=0, description="ID останнього запису попередньої сторінки"),
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+        fields: Optional[str] = Query(None, description="Поля через кому, напр. id,name")
+    ):
+        self.after_id = after_id
+        self.limit = limit
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+# columns: {назва поля у відповіді: колонка}; повертає лише запитані поля. Ключ "id" додається
+# завжди: з нього клієнт бере after_id для наступної сторінки
+def select_fields(columns, page: PageParams):
+    if not page.fields:
+        return [column.label(name) for name, column in columns.items()]
+    unknown = [name for name in page.fields if name not in columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Невідомі поля: {', '.join(unknown)}")
+    names = page.fields if "id" in page.fields else ["id", *page.fields]
+    return [columns[name].label(name) for name in names]
+
+def keyset_page(query, id_column, page: PageParams, schema):
+    if page.after_id is not None:
+        query = query.filter(id_column > page.after_id)
+    return page_response(query.order_by(id_column).limit(page.limit).all(), page, schema)
+
+# Те саме для асинхронної сесії: query — це select()
+async def keyset_page_async(db: "AsyncSession", query, id_column, page: PageParams, schema):
+    if page.after_id is not None:
+        query = query.where(id_column > page.after_id)
+    rows = (await db.execute(query.order_by(id_column).limit(page.limit))).all()
+    return page_response(rows, page, schema)
+
+def page_response(rows, page: PageParams, schema):
+    # Часткові записи не проходять схему відповіді, тому повертаються напряму
+    if page.fields:
+        return JSONResponse(jsonable_encoder([dict(row._mapping) for row in rows]))
+    return [schema(**row._mapping) for row in rows]
 
 class HotelCreate(BaseModel):
     name: str
     city: str
     address: str
 
-@app.post("/hotel/")
+@router.post("/hotel/")
 def init_hotel(hotel_data: HotelCreate, db: Session = Depends(get_db)):
     exists_hotel = db.query(Hotel).first()
     if exists_hotel:
@@ -63,13 +110,22 @@ class GuestOut(BaseModel):
     name: str
     age: int
     phone: str
-    email: EmailStr
+    email: Optional[EmailStr]  # гості з журналу lab3 та CLI можуть бути без пошти
     passport: str
 
     class Config:
         orm_mode = True
 
-@app.post("/guest/", response_model=GuestOut)
+GUEST_COLUMNS = {
+    "id": Guest.id,
+    "name": Guest.name,
+    "age": Guest.age,
+    "phone": Guest.phone,
+    "email": Guest.email,
+    "passport": Guest.passport,
+}
+
+@router.post("/guest/", response_model=GuestOut)
 def add_guest(guest_data: GuestCreate, db: Session = Depends(get_db)):
     guest = Guest(**guest_data.dict())
     db.add(guest)
@@ -77,17 +133,53 @@ def add_guest(guest_data: GuestCreate, db: Session = Depends(get_db)):
     db.refresh(guest)
     return guest
 
-@app.get("/guest/", response_model=List[GuestOut])
-def view_all_guests(db: Session = Depends(get_db)):
-    return db.query(Guest).all()
+class ImportErrorOut(BaseModel):
+    line: int
+    detail: str
+
+class ImportReportOut(BaseModel):
+    total: int
+    imported: int
+    failed: int
+    seconds: float
+    rows_per_second: float
+    errors: List[ImportErrorOut]
+
+# Масовий імпорт гостей з CSV/JSONL: файл розбирається потоково, коректні рядки вставляються
+# партіями в одній транзакції, некоректні повертаються у звіті з номером рядка
+@router.post("/guest/import", response_model=ImportReportOut)
+def import_guests(
+    file: UploadFile,
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|jsonl)$",
+                                       description="За замовчуванням — за розширенням файлу"),
+    batch_size: int = Query(importers.DEFAULT_BATCH_SIZE, ge=1, le=50_000),
+    db: Session = Depends(get_db)
+):
+    file_format = file_format or importers.detect_format(file.filename)
+    if file_format not in importers.FORMATS:
+        raise HTTPException(status_code=400, detail="Формат файлу має бути csv або jsonl")
+    database.begin_immediate(db)
+    rows = importers.read_rows(importers.text_stream(file.file), file_format)
+    try:
+        report = importers.import_guests(db, rows, GuestCreate, batch_size)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Файл має бути в кодуванні UTF-8")
+    db.commit()
+    return ImportReportOut(total=report.total, imported=report.imported, failed=report.failed,
+                           seconds=report.seconds, rows_per_second=report.rows_per_second,
+                           errors=[ImportErrorOut(line=e.line, detail=e.detail) for e in report.errors])
+
+@router.get("/guest/", response_model=List[GuestOut])
+async def view_all_guests(page: PageParams = Depends(), db=Depends(get_async_db)):
+    return await keyset_page_async(db, select(*select_fields(GUEST_COLUMNS, page)), Guest.id, page, GuestOut)
 
-@app.get("/guest/search", response_model=List[GuestOut])
+@router.get("/guest/search", response_model=List[GuestOut])
 def find_guest(keyword: str = Query(...), db: Session = Depends(get_db)):
     return db.query(Guest).filter(
         (Guest.name.contains(keyword)) | (Guest.phone.contains(keyword))
     ).all()
 
-@app.put("/guest/{guest_id}", response_model=GuestOut)
+@router.put("/guest/{guest_id}", response_model=GuestOut)
 def edit_guest(guest_id: int, guest_update: GuestUpdate, db: Session = Depends(get_db)):
     guest = db.query(Guest).get(guest_id)
     if not guest:
@@ -99,7 +191,7 @@ def edit_guest(guest_id: int, guest_update: GuestUpdate, db: Session = Depends(g
     db.refresh(guest)
     return guest
 
-@app.delete("/guest/{guest_id}")
+@router.delete("/guest/{guest_id}")
 def delete_guest(guest_id: int, db: Session = Depends(get_db)):
     guest = db.query(Guest).get(guest_id)
     if not guest:
@@ -108,7 +200,7 @@ def delete_guest(guest_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"message": "Гість видалений."}
 
-@app.get("/guest/sorted_by_age", response_model=List[GuestOut])
+@router.get("/guest/sorted_by_age", response_model=List[GuestOut])
 def sort_guests_by_age(db: Session = Depends(get_db)):
     return db.query(Guest).order_by(Guest.age).all()
 
@@ -134,7 +226,7 @@ class RoomTypeOut(BaseModel):
         orm_mode = True
 
 # Додати тип кімнати
-@app.post("/room_type/", response_model=RoomTypeOut)
+@router.post("/room_type/", response_model=RoomTypeOut)
 def add_room_type(room_type_data: RoomTypeCreate, db: Session = Depends(get_db)):
     rt = RoomType(**room_type_data.dict())
     db.add(rt)
@@ -143,12 +235,12 @@ def add_room_type(room_type_data: RoomTypeCreate, db: Session = Depends(get_db))
     return rt
 
 # Перегляд усіх типів кімнат
-@app.get("/room_type/", response_model=List[RoomTypeOut])
+@router.get("/room_type/", response_model=List[RoomTypeOut])
 def view_all_room_types(db: Session = Depends(get_db)):
     return db.query(RoomType).all()
 
 # Пошук типу кімнати за ключовим словом у типі
-@app.get("/room_type/search", response_model=List[RoomTypeOut])
+@router.get("/room_type/search", response_model=List[RoomTypeOut])
 def search_room_type(keyword: str = Query(...), db: Session = Depends(get_db)):
     results = db.query(RoomType).filter(RoomType.type.ilike(f"%{keyword}%")).all()
     if not results:
@@ -156,7 +248,7 @@ def search_room_type(keyword: str = Query(...), db: Session = Depends(get_db)):
     return results
 
 # Редагування типу кімнати
-@app.put("/room_type/{type_id}", response_model=RoomTypeOut)
+@router.put("/room_type/{type_id}", response_model=RoomTypeOut)
 def edit_room_type(type_id: int = Path(...), room_type_update: RoomTypeUpdate = Depends(), db: Session = Depends(get_db)):
     rt = db.query(RoomType).get(type_id)
     if not rt:
@@ -171,7 +263,7 @@ def edit_room_type(type_id: int = Path(...), room_type_update: RoomTypeUpdate =
     return rt
 
 # Видалення типу кімнати
-@app.delete("/room_type/{type_id}")
+@router.delete("/room_type/{type_id}")
 def delete_room_type(type_id: int = Path(...), db: Session = Depends(get_db)):
     rt = db.query(RoomType).get(type_id)
     if not rt:
@@ -182,7 +274,7 @@ def delete_room_type(type_id: int = Path(...), db: Session = Depends(get_db)):
     return {"message": "Тип кімнати видалено"}
 
 # Сортування типів кімнат
-@app.get("/room_type/sort", response_model=List[RoomTypeOut])
+@router.get("/room_type/sort", response_model=List[RoomTypeOut])
 def sort_room_types(by: str = Query("price", regex="^(price|max_guests)$"), db: Session = Depends(get_db)):
     if by == "price":
         results = db.query(RoomType).order_by(RoomType.price).all()
@@ -205,6 +297,7 @@ class RoomUpdate(BaseModel):
     type_id: Optional[int]
     status: Optional[RoomStatus]
     price_per_night: Optional[float]
+    version: Optional[int] = None
 
 class RoomOut(BaseModel):
     id: int
@@ -212,12 +305,27 @@ class RoomOut(BaseModel):
     status: RoomStatus
     price_per_night: float
     type: Optional[str]
+    version: int
 
     class Config:
         orm_mode = True
 
+ROOM_COLUMNS = {
+    "id": Room.id,
+    "type_id": Room.type_id,
+    "status": Room.status,
+    "price_per_night": Room.price_per_night,
+    "type": RoomType.type,
+    "version": Room.version,
+}
+
+# Відповідь з назвою типу, а не об'єктом зв'язку
+def room_out(room):
+    return RoomOut(id=room.id, type_id=room.type_id, status=room.status, price_per_night=room.price_per_night,
+                   type=room.type.type if room.type else None, version=room.version)
+
 # Додати кімнату
-@app.post("/room/", response_model=RoomOut)
+@router.post("/room/", response_model=RoomOut)
 def add_room(room_data: RoomCreate, db: Session = Depends(get_db)):
     room_type = db.query(RoomType).get(room_data.type_id)
     if not room_type:
@@ -231,20 +339,30 @@ def add_room(room_data: RoomCreate, db: Session = Depends(get_db)):
     db.add(room)
     db.commit()
     db.refresh(room)
-    return room
+    return room_out(room)
 
 # Перегляд усіх кімнат
-@app.get("/room/", response_model=List[RoomOut])
-def view_all_rooms(db: Session = Depends(get_db)):
-    rooms = db.query(Room).all()
-    return rooms
+@router.get("/room/", response_model=List[RoomOut])
+async def view_all_rooms(page: PageParams = Depends(), db=Depends(get_async_db)):
+    query = select(*select_fields(ROOM_COLUMNS, page)).select_from(Room) \
+        .outerjoin(RoomType, RoomType.id == Room.type_id)
+    return await keyset_page_async(db, query, Room.id, page, RoomOut)
+
+# Оптимістичне блокування: клієнт передає версію, яку бачив. Якщо запис відтоді змінили,
+# повертається 409 і клієнт має перечитати дані. Гонку між перевіркою та UPDATE ловить
+# version_id_col моделі (StaleDataError, обробник нижче)
+def check_version(row, version):
+    if version is not None and row.version != version:
+        raise HTTPException(status_code=409, detail="Запис змінено іншим користувачем, оновіть дані")
 
 # Редагування кімнати
-@app.put("/room/{room_id}", response_model=RoomOut)
+@router.put("/room/{room_id}", response_model=RoomOut)
+@database.retry_on_busy
 def edit_room(room_id: int, room_update: RoomUpdate, db: Session = Depends(get_db)):
     room = db.query(Room).get(room_id)
     if not room:
         raise HTTPException(status_code=404, detail="Кімната не знайдена")
+    check_version(room, room_update.version)
 
     if room_update.type_id:
         room_type = db.query(RoomType).get(room_update.type_id)
@@ -262,10 +380,10 @@ def edit_room(room_id: int, room_update: RoomUpdate, db: Session = Depends(get_d
 
     db.commit()
     db.refresh(room)
-    return room
+    return room_out(room)
 
 # Видалення кімнати
-@app.delete("/room/{room_id}")
+@router.delete("/room/{room_id}")
 def delete_room(room_id: int, db: Session = Depends(get_db)):
     room = db.query(Room).get(room_id)
     if not room:
@@ -296,7 +414,7 @@ class PositionOut(BaseModel):
         orm_mode = True
 
 # Додати посаду
-@app.post("/position/", response_model=PositionOut)
+@router.post("/position/", response_model=PositionOut)
 def add_position(pos_data: PositionCreate, db: Session = Depends(get_db)):
     pos = Position(**pos_data.dict())
     db.add(pos)
@@ -305,13 +423,13 @@ def add_position(pos_data: PositionCreate, db: Session = Depends(get_db)):
     return pos
 
 # Переглянути всі посади
-@app.get("/position/", response_model=List[PositionOut])
+@router.get("/position/", response_model=List[PositionOut])
 def view_positions(db: Session = Depends(get_db)):
     positions = db.query(Position).all()
     return positions
 
 # Пошук посад за ключовим словом у title або department
-@app.get("/position/search", response_model=List[PositionOut])
+@router.get("/position/search", response_model=List[PositionOut])
 def find_position(keyword: str = Query(..., description="Пошук за назвою посади або відділом"), db: Session = Depends(get_db)):
     positions = db.query(Position).filter(
         (Position.title.contains(keyword)) | (Position.department.contains(keyword))
@@ -321,7 +439,7 @@ def find_position(keyword: str = Query(..., description="Пошук за наз
     return positions
 
 # Редагувати посаду
-@app.put("/position/{pos_id}", response_model=PositionOut)
+@router.put("/position/{pos_id}", response_model=PositionOut)
 def edit_position(pos_id: int, pos_update: PositionUpdate, db: Session = Depends(get_db)):
     pos = db.query(Position).get(pos_id)
     if not pos:
@@ -336,7 +454,7 @@ def edit_position(pos_id: int, pos_update: PositionUpdate, db: Session = Depends
     return pos
 
 # Видалити посаду
-@app.delete("/position/{pos_id}")
+@router.delete("/position/{pos_id}")
 def delete_position(pos_id: int, db: Session = Depends(get_db)):
     pos = db.query(Position).get(pos_id)
     if not pos:
@@ -371,7 +489,7 @@ class StaffOut(BaseModel):
         orm_mode = True
 
 # Додати працівника
-@app.post("/staff/", response_model=StaffOut)
+@router.post("/staff/", response_model=StaffOut)
 def add_staff(staff_data: StaffCreate, db: Session = Depends(get_db)):
     # Перевірка позиції
     position = db.query(Position).get(staff_data.position_id)
@@ -397,7 +515,7 @@ def add_staff(staff_data: StaffCreate, db: Session = Depends(get_db)):
     return staff
 
 # Переглянути всіх працівників
-@app.get("/staff/", response_model=List[StaffOut])
+@router.get("/staff/", response_model=List[StaffOut])
 def view_staff(db: Session = Depends(get_db)):
     staff_list = db.query(Staff).all()
     for s in staff_list:
@@ -405,7 +523,7 @@ def view_staff(db: Session = Depends(get_db)):
     return staff_list
 
 # Пошук працівника по імені або телефону
-@app.get("/staff/search", response_model=List[StaffOut])
+@router.get("/staff/search", response_model=List[StaffOut])
 def find_staff(keyword: str = Query(..., description="Пошук по імені або телефону"), db: Session = Depends(get_db)):
     staff_list = db.query(Staff).filter(
         (Staff.name.contains(keyword)) | (Staff.phone.contains(keyword))
@@ -417,7 +535,7 @@ def find_staff(keyword: str = Query(..., description="Пошук по імені
     return staff_list
 
 # Редагувати працівника
-@app.put("/staff/{staff_id}", response_model=StaffOut)
+@router.put("/staff/{staff_id}", response_model=StaffOut)
 def edit_staff(staff_id: int, staff_update: StaffUpdate, db: Session = Depends(get_db)):
     staff = db.query(Staff).get(staff_id)
     if not staff:
@@ -440,7 +558,7 @@ def edit_staff(staff_id: int, staff_update: StaffUpdate, db: Session = Depends(g
     return staff
 
 # Видалити працівника
-@app.delete("/staff/{staff_id}")
+@router.delete("/staff/{staff_id}")
 def delete_staff(staff_id: int, db: Session = Depends(get_db)):
     staff = db.query(Staff).get(staff_id)
     if not staff:
@@ -466,6 +584,7 @@ class BookingUpdate(BaseModel):
     status: Optional[BookingStatus] = None
     check_in: Optional[datetime.date] = None
     check_out: Optional[datetime.date] = None
+    version: Optional[int] = None
 
 class BookingRead(BaseModel):
     id: int
@@ -477,35 +596,34 @@ class BookingRead(BaseModel):
     check_out: datetime.date
     status: BookingStatus
     price_per_night: float
+    version: int
 
     class Config:
         orm_mode = True
 
-@app.post("/bookings/", response_model=BookingRead)
+@router.post("/bookings/", response_model=BookingRead)
+@database.retry_on_busy
 def add_booking(data: BookingCreate, db: Session = Depends(get_db)):
+    # Перевірка дат
+    if data.check_out <= data.check_in:
+        raise HTTPException(status_code=400, detail="Дата виїзду повинна бути пізніше дати заїзду")
+    database.begin_immediate(db)
+
     # Перевірка гостя
     guest = db.query(Guest).get(data.guest_id)
     if not guest:
         raise HTTPException(status_code=404, detail="Гість не знайдений")
 
-    # Перевірка кімнати
+    # Перевірка кімнати: відхиляються лише кімнати на ремонті, зайнятість — за датами нижче.
+    # Статус "Зайнятий" не враховується: він не залежить від дат і лишився б після виїзду чи скасування
     room = db.query(Room).get(data.room_id)
-    if not room or room.status != RoomStatus.Вільний:
+    if not room or room.status.value == RoomStatus.На_ремонті:
         raise HTTPException(status_code=400, detail="Недоступна кімната")
 
-    # Перевірка дат
-    if data.check_out <= data.check_in:
-        raise HTTPException(status_code=400, detail="Дата виїзду повинна бути пізніше дати заїзду")
-
-    # Перевірка кількості бронювань для кімнати в період
-    overlapping_bookings = db.query(Booking).filter(
-        Booking.room_id == data.room_id,
-        Booking.status == BookingStatus.Активно,
-        Booking.check_out > data.check_in,
-        Booking.check_in < data.check_out
-    ).count()
-
+    # Найбільша кількість бронювань за ніч у періоді — за календарем room_night у тій самій
+    # транзакції, що й вставка
     max_guests = room.type.max_guests
+    overlapping_bookings = peak_room_nights(db, data.room_id, data.check_in, data.check_out)
     if overlapping_bookings >= max_guests:
         raise HTTPException(status_code=400, detail=f"Кімната вже зайнята на цей період. Макс гостей: {max_guests}")
 
@@ -519,6 +637,7 @@ def add_booking(data: BookingCreate, db: Session = Depends(get_db)):
         price_per_night=room.price_per_night
     )
     db.add(booking)
+    book_room_nights(db, data.room_id, data.check_in, data.check_out)
 
     # Оновлення статусу кімнати, якщо вона повністю зайнята
     if overlapping_bookings + 1 >= max_guests:
@@ -536,61 +655,240 @@ def add_booking(data: BookingCreate, db: Session = Depends(get_db)):
         check_in=booking.check_in,
         check_out=booking.check_out,
         status=booking.status,
-        price_per_night=booking.price_per_night
+        price_per_night=booking.price_per_night,
+        version=booking.version
     )
 
-@app.get("/bookings/", response_model=List[BookingRead])
-def view_bookings(db: Session = Depends(get_db)):
-    bookings = db.query(Booking).all()
-    results = []
-    for b in bookings:
-        guest = db.query(Guest).get(b.guest_id)
-        room = db.query(Room).get(b.room_id)
-        results.append(BookingRead(
-            id=b.id,
-            guest_id=b.guest_id,
-            guest_name=guest.name if guest else None,
-            room_id=b.room_id,
-            room_type=room.type.type if room else None,
-            check_in=b.check_in,
-            check_out=b.check_out,
-            status=b.status,
-            price_per_night=b.price_per_night
-        ))
-    return results
-
-@app.get("/bookings/search/", response_model=List[BookingRead])
-def find_booking_by_guest(keyword: str = Query(..., min_length=1), db: Session = Depends(get_db)):
-    guests = db.query(Guest).filter(Guest.name.contains(keyword)).all()
-    if not guests:
-        raise HTTPException(status_code=404, detail="Гості не знайдені")
-    guest_ids = [g.id for g in guests]
-    bookings = db.query(Booking).filter(Booking.guest_id.in_(guest_ids)).all()
-    if not bookings:
+# Групові бронювання (туроператори): всі позиції перевіряються за календарем room_night,
+# прочитаним одним запитом, і вставляються одним executemany в одній транзакції запису.
+# all_or_nothing — жодна позиція не створюється, якщо хоч одна відхилена (відповідь 400);
+# best_effort — створюються всі допустимі позиції
+BULK_MAX_ITEMS = 1000
+
+class BulkMode(str, Enum):
+    all_or_nothing = "all_or_nothing"
+    best_effort = "best_effort"
+
+class BookingBulkCreate(BaseModel):
+    items: List[BookingCreate]
+    mode: BulkMode = BulkMode.all_or_nothing
+
+class BookingBulkItem(BaseModel):
+    index: int
+    status: str  # created, rejected або skipped (допустима, але пакет відхилено)
+    detail: Optional[str] = None
+    booking: Optional[BookingRead] = None
+
+class BookingBulkResult(BaseModel):
+    mode: BulkMode
+    created: int
+    rejected: int
+    items: List[BookingBulkItem]
+
+def booking_nights(item):
+    return [item.check_in + datetime.timedelta(days=i) for i in range((item.check_out - item.check_in).days)]
+
+@router.post("/bookings/bulk", response_model=BookingBulkResult)
+@database.retry_on_busy
+def add_bookings_bulk(data: BookingBulkCreate, response: Response, db: Session = Depends(get_db)):
+    items = data.items
+    if not items:
+        raise HTTPException(status_code=400, detail="Список бронювань порожній")
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Не більше {BULK_MAX_ITEMS} бронювань за запит")
+    database.begin_immediate(db)
+
+    guests = dict(db.execute(select(Guest.id, Guest.name)
+                             .where(Guest.id.in_({item.guest_id for item in items}))).all())
+    rooms = {row.id: row for row in db.execute(
+        select(Room.id, Room.status, Room.price_per_night, RoomType.type, RoomType.max_guests)
+        .join(RoomType, RoomType.id == Room.type_id)
+        .where(Room.id.in_({item.room_id for item in items})))}
+
+    # Зайнятість лише запитаних ночей: календар з'єднується зі списком позицій, переданим
+    # одним JSON-параметром (json_each), тож запит не залежить від кількості позицій
+    dated = [item for item in items if item.check_out > item.check_in]
+    booked = collections.defaultdict(int)
+    if dated:
+        requested = func.json_each(json.dumps([[item.room_id, item.check_in.isoformat(), item.check_out.isoformat()]
+                                               for item in dated])).table_valued("value")
+        booked.update({(row.room_id, row.date): row.booked_count for row in db.execute(
+            select(RoomNight.room_id, RoomNight.date, RoomNight.booked_count).distinct().join(requested, and_(
+                RoomNight.room_id == func.json_extract(requested.c.value, "$[0]"),
+                RoomNight.date >= func.json_extract(requested.c.value, "$[1]"),
+                RoomNight.date < func.json_extract(requested.c.value, "$[2]"))))})
+
+    # Позиції перевіряються по черзі з урахуванням уже прийнятих — як послідовні POST /bookings/
+    results, accepted, full_rooms = [], [], set()
+    for index, item in enumerate(items):
+        room = rooms.get(item.room_id)
+        detail = None
+        if item.check_out <= item.check_in:
+            detail = "Дата виїзду повинна бути пізніше дати заїзду"
+        elif item.guest_id not in guests:
+            detail = "Гість не знайдений"
+        elif not room or room.status.value == RoomStatus.На_ремонті:
+            detail = "Недоступна кімната"
+        else:
+            nights = booking_nights(item)
+            peak = max(booked[item.room_id, night] for night in nights)
+            if peak >= room.max_guests:
+                detail = f"Кімната вже зайнята на цей період. Макс гостей: {room.max_guests}"
+        if detail:
+            results.append(BookingBulkItem(index=index, status="rejected", detail=detail))
+            continue
+        for night in nights:
+            booked[item.room_id, night] += 1
+        if peak + 1 >= room.max_guests:
+            full_rooms.add(item.room_id)
+        accepted.append((index, item))
+        results.append(BookingBulkItem(index=index, status="created"))
+
+    rejected = len(items) - len(accepted)
+    if rejected and data.mode == BulkMode.all_or_nothing:
+        db.rollback()
+        for result in results:
+            if result.status == "created":
+                result.status = "skipped"
+        response.status_code = 400
+        return BookingBulkResult(mode=data.mode, created=0, rejected=rejected, items=results)
+
+    if accepted:
+        # Один executemany без RETURNING (з RETURNING SQLAlchemy вставляє рядки по одному для SQLite).
+        # Під блокуванням запису рядки отримують id по черзі після найбільшого наявного
+        last_id = db.scalar(select(func.coalesce(func.max(Booking.id), 0)))
+        db.execute(insert(Booking.__table__), [
+            {"guest_id": item.guest_id, "room_id": item.room_id, "check_in": item.check_in,
+             "check_out": item.check_out, "status": BookingStatus.Активно,
+             "price_per_night": rooms[item.room_id].price_per_night}
+            for _, item in accepted
+        ])
+        ids = db.scalars(select(Booking.id).where(Booking.id > last_id).order_by(Booking.id)).all()
+        night_counts = collections.Counter((item.room_id, night) for _, item in accepted for night in booking_nights(item))
+        add_room_nights(db, [{"room_id": room_id, "date": night, "booked_count": count}
+                             for (room_id, night), count in night_counts.items()])
+        if full_rooms:
+            db.execute(update(Room).where(Room.id.in_(full_rooms))
+                       .values(status=RoomStatus.Зайнятий, version=Room.version + 1))
+        db.commit()
+
+        for (index, item), booking_id in zip(accepted, ids):
+            room = rooms[item.room_id]
+            results[index].booking = BookingRead(
+                id=booking_id, guest_id=item.guest_id, guest_name=guests[item.guest_id],
+                room_id=item.room_id, room_type=room.type, check_in=item.check_in, check_out=item.check_out,
+                status=BookingStatus.Активно, price_per_night=room.price_per_night, version=1)
+
+    return BookingBulkResult(mode=data.mode, created=len(accepted), rejected=rejected, items=results)
+
+# Спільна модель читання бронювань: один SELECT з JOIN гостя, кімнати та типу кімнати
+BOOKING_READ_COLUMNS = {
+    "id": Booking.id,
+    "guest_id": Booking.guest_id,
+    "guest_name": Guest.name,
+    "room_id": Booking.room_id,
+    "room_type": RoomType.type,
+    "check_in": Booking.check_in,
+    "check_out": Booking.check_out,
+    "status": Booking.status,
+    "price_per_night": Booking.price_per_night,
+    "version": Booking.version,
+}
+
+def booking_read_query(columns=None):
+    if columns is None:
+        columns = [column.label(name) for name, column in BOOKING_READ_COLUMNS.items()]
+    return select(*columns).select_from(Booking) \
+        .outerjoin(Guest, Guest.id == Booking.guest_id) \
+        .outerjoin(Room, Room.id == Booking.room_id) \
+        .outerjoin(RoomType, RoomType.id == Room.type_id)
+
+def booking_read_list(rows):
+    return [BookingRead(**row._mapping) for row in rows]
+
+@router.get("/bookings/", response_model=List[BookingRead])
+async def view_bookings(page: PageParams = Depends(), db=Depends(get_async_db)):
+    query = booking_read_query(select_fields(BOOKING_READ_COLUMNS, page))
+    return await keyset_page_async(db, query, Booking.id, page, BookingRead)
+
+@router.get("/bookings/search/", response_model=List[BookingRead])
+async def find_booking_by_guest(keyword: str = Query(..., min_length=1), db=Depends(get_async_db)):
+    rows = (await db.execute(booking_read_query().where(Guest.name.contains(keyword)))).all()
+    if not rows:
+        if not (await db.execute(select(Guest.id).where(Guest.name.contains(keyword)).limit(1))).first():
+            raise HTTPException(status_code=404, detail="Гості не знайдені")
         raise HTTPException(status_code=404, detail="Бронювання не знайдено")
+    return booking_read_list(rows)
 
-    results = []
-    for b in bookings:
-        room = db.query(Room).get(b.room_id)
-        guest = next((g for g in guests if g.id == b.guest_id), None)
-        results.append(BookingRead(
-            id=b.id,
-            guest_id=b.guest_id,
-            guest_name=guest.name if guest else None,
-            room_id=b.room_id,
-            room_type=room.type.type if room else None,
-            check_in=b.check_in,
-            check_out=b.check_out,
-            status=b.status,
-            price_per_night=b.price_per_night
-        ))
-    return results
+# Пошук вільних кімнат по всьому готелю на період
+class RoomAvailability(BaseModel):
+    room_id: int
+    room_type: str
+    price_per_night: float
+    max_guests: int
+    free: int
+
+@router.get("/availability", response_model=List[RoomAvailability])
+async def search_availability(
+    check_in: datetime.date,
+    check_out: datetime.date,
+    guests: int = Query(1, ge=1),
+    room_type: Optional[str] = Query(None, alias="type"),
+    db=Depends(get_async_db)
+):
+    if check_out <= check_in:
+        raise HTTPException(status_code=400, detail="Дата виїзду повинна бути пізніше дати заїзду")
 
-@app.put("/bookings/{booking_id}", response_model=BookingRead)
+    # Один запит: найбільша зайнятість кожної кімнати за ніч у періоді — з календаря room_night.
+    # Кімнати відбираються за тим самим правилом, що й у add_booking: усі, крім тих, що на ремонті
+    booked = select(RoomNight.room_id, func.max(RoomNight.booked_count).label("booked")).where(
+        RoomNight.date >= check_in,
+        RoomNight.date < check_out
+    ).group_by(RoomNight.room_id).subquery()
+    free = RoomType.max_guests - func.coalesce(booked.c.booked, 0)
+
+    query = select(
+        Room.id.label("room_id"),
+        RoomType.type.label("room_type"),
+        Room.price_per_night,
+        RoomType.max_guests,
+        free.label("free")
+    ).join(RoomType, RoomType.id == Room.type_id) \
+     .outerjoin(booked, booked.c.room_id == Room.id) \
+     .where(Room.status != RoomStatus.На_ремонті, free >= guests)
+    if room_type:
+        query = query.where(RoomType.type == room_type)
+    return [RoomAvailability(**row._mapping) for row in await db.execute(query.order_by(Room.id))]
+
+# Звіт про зайнятість: агрегат по календарю room_night
+class OccupancyDay(BaseModel):
+    date: datetime.date
+    booked: int
+    rooms: int
+
+@router.get("/occupancy", response_model=List[OccupancyDay])
+async def occupancy_report(start: datetime.date, end: datetime.date, db=Depends(get_async_db)):
+    if end <= start:
+        raise HTTPException(status_code=400, detail="Кінець періоду повинен бути пізніше початку")
+    rows = await db.execute(select(
+        RoomNight.date,
+        func.sum(RoomNight.booked_count).label("booked"),
+        func.count(RoomNight.room_id).label("rooms")
+    ).where(RoomNight.date >= start, RoomNight.date < end)
+     .group_by(RoomNight.date).order_by(RoomNight.date))
+    return [OccupancyDay(**row._mapping) for row in rows]
+
+@router.put("/bookings/{booking_id}", response_model=BookingRead)
+@database.retry_on_busy
 def edit_booking(booking_id: int, data: BookingUpdate, db: Session = Depends(get_db)):
+    # Перевірка місць на нових датах і запис календаря — під одним блокуванням запису
+    database.begin_immediate(db)
     booking = db.query(Booking).get(booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Бронювання не знайдено")
+    check_version(booking, data.version)
+    was_active = booking.status.value == BookingStatus.Активно
+    old_check_in, old_check_out = booking.check_in, booking.check_out
 
     # Оновлення статусу
     if data.status:
@@ -605,6 +903,11 @@ def edit_booking(booking_id: int, data: BookingUpdate, db: Session = Depends(get
     booking.check_in = check_in
     booking.check_out = check_out
 
+    # Календар зайнятості оновлюється в тій самій транзакції
+    if not move_room_nights(db, booking, was_active, old_check_in, old_check_out):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Кімната вже зайнята на ці дати")
+
     db.commit()
     db.refresh(booking)
 
@@ -620,40 +923,29 @@ def edit_booking(booking_id: int, data: BookingUpdate, db: Session = Depends(get
         check_in=booking.check_in,
         check_out=booking.check_out,
         status=booking.status,
-        price_per_night=booking.price_per_night
+        price_per_night=booking.price_per_night,
+        version=booking.version
     )
 
-@app.delete("/bookings/{booking_id}")
-def delete_booking(booking_id: int, db: Session = Depends(get_db)):
+@router.delete("/bookings/{booking_id}")
+@database.retry_on_busy
+def delete_booking(booking_id: int, version: Optional[int] = None, db: Session = Depends(get_db)):
     booking = db.query(Booking).get(booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Бронювання не знайдено")
+    check_version(booking, version)
     room = db.query(Room).get(booking.room_id)
     if room:
         room.status = RoomStatus.Вільний
+    if booking.status.value == BookingStatus.Активно:
+        book_room_nights(db, booking.room_id, booking.check_in, booking.check_out, -1)
     db.delete(booking)
     db.commit()
     return {"detail": "Бронювання видалено"}
 
-@app.get("/bookings/sorted/", response_model=List[BookingRead])
-def sort_bookings_by_check_in(db: Session = Depends(get_db)):
-    bookings = db.query(Booking).order_by(Booking.check_in).all()
-    results = []
-    for b in bookings:
-        guest = db.query(Guest).get(b.guest_id)
-        room = db.query(Room).get(b.room_id)
-        results.append(BookingRead(
-            id=b.id,
-            guest_id=b.guest_id,
-            guest_name=guest.name if guest else None,
-            room_id=b.room_id,
-            room_type=room.type.type if room else None,
-            check_in=b.check_in,
-            check_out=b.check_out,
-            status=b.status,
-            price_per_night=b.price_per_night
-        ))
-    return results
+@router.get("/bookings/sorted/", response_model=List[BookingRead])
+async def sort_bookings_by_check_in(db=Depends(get_async_db)):
+    return booking_read_list((await db.execute(booking_read_query().order_by(Booking.check_in))).all())
 
 # Pydantic схеми для валідації вхідних та вихідних даних
 class ServiceCreate(BaseModel):
@@ -668,16 +960,14 @@ class ServiceRead(BaseModel):
     class Config:
         orm_mode = True
 
-# Залежність для отримання сесії БД
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+SERVICE_COLUMNS = {
+    "id": Service.id,
+    "name": Service.name,
+    "price": Service.price,
+}
 
 # Створити нову послугу
-@app.post("/services/", response_model=ServiceRead)
+@router.post("/services/", response_model=ServiceRead)
 def create_service(service: ServiceCreate, db: Session = Depends(get_db)):
     db_service = Service(name=service.name, price=service.price)
     db.add(db_service)
@@ -686,19 +976,18 @@ def create_service(service: ServiceCreate, db: Session = Depends(get_db)):
     return db_service
 
 # Переглянути всі послуги
-@app.get("/services/", response_model=List[ServiceRead])
-def read_services(db: Session = Depends(get_db)):
-    services = db.query(Service).all()
-    return services
+@router.get("/services/", response_model=List[ServiceRead])
+def read_services(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return keyset_page(db.query(*select_fields(SERVICE_COLUMNS, page)), Service.id, page, ServiceRead)
 
 # Пошук послуги за ключовим словом у назві
-@app.get("/services/search/", response_model=List[ServiceRead])
+@router.get("/services/search/", response_model=List[ServiceRead])
 def search_services(keyword: str, db: Session = Depends(get_db)):
     services = db.query(Service).filter(Service.name.contains(keyword)).all()
     return services
 
 # Отримати послугу за ID
-@app.get("/services/{service_id}", response_model=ServiceRead)
+@router.get("/services/{service_id}", response_model=ServiceRead)
 def read_service(service_id: int, db: Session = Depends(get_db)):
     service = db.query(Service).get(service_id)
     if not service:
@@ -706,7 +995,7 @@ def read_service(service_id: int, db: Session = Depends(get_db)):
     return service
 
 # Оновити послугу
-@app.put("/services/{service_id}", response_model=ServiceRead)
+@router.put("/services/{service_id}", response_model=ServiceRead)
 def update_service(service_id: int, service_data: ServiceCreate, db: Session = Depends(get_db)):
     service = db.query(Service).get(service_id)
     if not service:
@@ -718,7 +1007,7 @@ def update_service(service_id: int, service_data: ServiceCreate, db: Session = D
     return service
 
 # Видалити послугу
-@app.delete("/services/{service_id}")
+@router.delete("/services/{service_id}")
 def delete_service(service_id: int, db: Session = Depends(get_db)):
     service = db.query(Service).get(service_id)
     if not service:
@@ -728,7 +1017,7 @@ def delete_service(service_id: int, db: Session = Depends(get_db)):
     return {"detail": "Послугу видалено"}
 
 # Сортування послуг за ціною (низхідне або висхідне)
-@app.get("/services/sorted/", response_model=List[ServiceRead])
+@router.get("/services/sorted/", response_model=List[ServiceRead])
 def sorted_services(order: str = "asc", db: Session = Depends(get_db)):
     if order == "asc":
         services = db.query(Service).order_by(Service.price.asc()).all()
@@ -748,23 +1037,24 @@ class GuestServiceRead(BaseModel):
     id: int
     guest_id: int
     service_id: int
-    date: Optional[datetime.date]
+    date: Optional[datetime.date] = None
     guest_name: Optional[str] = None
     service_name: Optional[str] = None
 
     class Config:
         orm_mode = True
 
-# Залежність для сесії БД
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+GUEST_SERVICE_COLUMNS = {
+    "id": GuestService.id,
+    "guest_id": GuestService.guest_id,
+    "service_id": GuestService.service_id,
+    "date": GuestService.date,
+    "guest_name": Guest.name,
+    "service_name": Service.name,
+}
 
 # Додати послугу гостю
-@app.post("/guest_services/", response_model=GuestServiceRead)
+@router.post("/guest_services/", response_model=GuestServiceRead)
 def add_guest_service(data: GuestServiceCreate, db: Session = Depends(get_db)):
     # Перевірка чи гість існує
     guest = db.query(Guest).get(data.guest_id)
@@ -786,17 +1076,16 @@ def add_guest_service(data: GuestServiceCreate, db: Session = Depends(get_db)):
     return gs
 
 # Переглянути всі послуги гостей
-@app.get("/guest_services/", response_model=List[GuestServiceRead])
-def view_guest_services(db: Session = Depends(get_db)):
-    gs_list = db.query(GuestService).all()
-    # Додамо ім'я гостя та послуги у відповідь
-    for gs in gs_list:
-        gs.guest_name = gs.guest.name if gs.guest else None
-        gs.service_name = gs.service.name if gs.service else None
-    return gs_list
+@router.get("/guest_services/", response_model=List[GuestServiceRead])
+def view_guest_services(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    # Ім'я гостя та назва послуги — в тому ж запиті
+    query = db.query(*select_fields(GUEST_SERVICE_COLUMNS, page)).select_from(GuestService) \
+        .outerjoin(Guest, Guest.id == GuestService.guest_id) \
+        .outerjoin(Service, Service.id == GuestService.service_id)
+    return keyset_page(query, GuestService.id, page, GuestServiceRead)
 
 # Пошук по імені гостя або назві послуги
-@app.get("/guest_services/search/", response_model=List[GuestServiceRead])
+@router.get("/guest_services/search/", response_model=List[GuestServiceRead])
 def find_guest_services(keyword: str = Query(..., min_length=1), db: Session = Depends(get_db)):
     gs_list = db.query(GuestService).join(Guest).join(Service).filter(
         (Guest.name.contains(keyword)) | (Service.name.contains(keyword))
@@ -807,7 +1096,7 @@ def find_guest_services(keyword: str = Query(..., min_length=1), db: Session = D
     return gs_list
 
 # Редагувати запис гостя-сервісу
-@app.put("/guest_services/{gs_id}", response_model=GuestServiceRead)
+@router.put("/guest_services/{gs_id}", response_model=GuestServiceRead)
 def edit_guest_service(gs_id: int, data: GuestServiceCreate, db: Session = Depends(get_db)):
     gs = db.query(GuestService).get(gs_id)
     if not gs:
@@ -832,7 +1121,7 @@ def edit_guest_service(gs_id: int, data: GuestServiceCreate, db: Session = Depen
     return gs
 
 # Видалити запис гостя-сервісу
-@app.delete("/guest_services/{gs_id}")
+@router.delete("/guest_services/{gs_id}")
 def delete_guest_service(gs_id: int, db: Session = Depends(get_db)):
     gs = db.query(GuestService).get(gs_id)
     if not gs:
@@ -852,20 +1141,74 @@ class PaymentRead(BaseModel):
     booking_id: int
     amount: float
     date: datetime.date
-    method: str
+    method: PaymentMethod
+    version: int
 
     class Config:
         orm_mode = True
 
+class PaymentUpdate(BaseModel):
+    amount: Optional[float] = None
+    method: Optional[PaymentMethod] = None
+    version: Optional[int] = None
+
+
+PAYMENT_COLUMNS = {
+    "id": Payment.id,
+    "booking_id": Payment.booking_id,
+    "amount": Payment.amount,
+    "date": Payment.date,
+    "method": Payment.method,
+    "version": Payment.version,
+}
+
+class InvoiceLineRead(BaseModel):
+    service_id: int
+    name: Optional[str] = None
+    price: float
+    quantity: int
+    amount: float
+
+class InvoiceRead(BaseModel):
+    booking_id: int
+    nights: int
+    price_per_night: float
+    room_cost: float
+    services: List[InvoiceLineRead]
+    service_cost: float
+    total: float
+
+def invoice_read(invoice):
+    return InvoiceRead(
+        booking_id=invoice.booking_id,
+        nights=invoice.nights,
+        price_per_night=invoice.price_per_night,
+        room_cost=invoice.room_cost,
+        services=[InvoiceLineRead(service_id=line.service_id, name=line.name, price=line.price,
+                                  quantity=line.quantity, amount=line.amount) for line in invoice.services],
+        service_cost=invoice.service_cost,
+        total=invoice.total
+    )
+
+# Рахунок до оплати: проживання та послуги гостя за дати бронювання
+@router.get("/bookings/{booking_id}/invoice", response_model=InvoiceRead)
+def get_invoice(booking_id: int, db: Session = Depends(get_db)):
+    booking = db.query(Booking).get(booking_id)
+    if not booking:
+        raise HTTPException(status_code=404, detail="Бронювання не знайдено")
+    return invoice_read(compute_invoice(db, booking))
 
-@app.post("/payments/", response_model=PaymentRead)
+@router.post("/payments/", response_model=PaymentRead)
+@database.retry_on_busy
 def add_payment(payment_in: PaymentCreate, db: Session = Depends(get_db)):
+    # Перевірка наявної оплати та вставка — в одній транзакції запису
+    database.begin_immediate(db)
 
     booking = db.query(Booking).filter(Booking.id == payment_in.booking_id).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Бронювання не знайдено")
 
-    if booking.status != BookingStatus.Активно:
+    if booking.status.value != BookingStatus.Активно:
         raise HTTPException(status_code=400, detail="Оплата можлива лише для активних бронювань")
 
     # Перевірка чи вже є оплата для цього бронювання
@@ -873,19 +1216,8 @@ def add_payment(payment_in: PaymentCreate, db: Session = Depends(get_db)):
     if existing_payment:
         raise HTTPException(status_code=400, detail="Бронювання вже оплачено")
 
-    # Розрахунок вартості номера
-    num_nights = (booking.check_out - booking.check_in).days
-    room_cost = num_nights * booking.price_per_night
-
-    # Розрахунок сервісів
-    guest_services = db.query(GuestService).filter_by(guest_id=booking.guest_id).all()
-    service_cost = 0
-    for gs in guest_services:
-        service = db.query(Service).get(gs.service_id)
-        if service:
-            service_cost += service.price
-
-    total_amount = room_cost + service_cost
+    # Розрахунок вартості номера та послуг за час проживання
+    total_amount = compute_invoice(db, booking).total
 
     # Перевірка методу оплати
     if payment_in.method not in [m.value for m in PaymentMethod]:
@@ -904,14 +1236,118 @@ def add_payment(payment_in: PaymentCreate, db: Session = Depends(get_db)):
 
     return payment
 
-@app.get("/payments/", response_model=List[PaymentRead])
-def view_payments(db: Session = Depends(get_db)):
-    payments = db.query(Payment).all()
-    return payments
+@router.put("/payments/{payment_id}", response_model=PaymentRead)
+@database.retry_on_busy
+def edit_payment(payment_id: int, data: PaymentUpdate, db: Session = Depends(get_db)):
+    payment = db.query(Payment).get(payment_id)
+    if not payment:
+        raise HTTPException(status_code=404, detail="Оплату не знайдено")
+    check_version(payment, data.version)
+
+    if data.amount is not None:
+        if data.amount < 0:
+            raise HTTPException(status_code=400, detail="Сума не може бути від'ємною")
+        payment.amount = data.amount
+    if data.method:
+        payment.method = data.method
+
+    db.commit()
+    db.refresh(payment)
+    return payment
+
+@router.get("/payments/", response_model=List[PaymentRead])
+def view_payments(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    return keyset_page(db.query(*select_fields(PAYMENT_COLUMNS, page)), Payment.id, page, PaymentRead)
 
-@app.get("/payments/{payment_id}", response_model=PaymentRead)
+@router.get("/payments/{payment_id}", response_model=PaymentRead)
 def get_payment(payment_id: int, db: Session = Depends(get_db)):
     payment = db.query(Payment).get(payment_id)
     if not payment:
         raise HTTPException(status_code=404, detail="Оплата не знайдена")
-    return payment
\ No newline at end of file
+    return payment
+# Потоковий експорт для нічних вивантажень: рядки читаються порціями з курсора
+# і одразу віддаються клієнтові, тож пам'ять не залежить від розміру таблиці
+EXPORT_BATCH_SIZE = 1000
+
+def export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+def export_rows(columns, id_column, outerjoins=()):
+    # Сесія відкривається в генераторі й живе, поки відповідь передається клієнтові
+    with SessionLocal() as db:
+        query = select(*[column.label(name) for name, column in columns.items()])
+        for table, condition in outerjoins:
+            query = query.outerjoin(table, condition)
+        result = db.execute(query.order_by(id_column).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            yield [[export_value(value) for value in row] for row in batch]
+
+def ndjson_stream(columns, batches):
+    names = list(columns)
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n" for row in batch)
+
+def csv_stream(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(columns))
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_response(columns, id_column, export_format, filename, outerjoins=()):
+    batches = export_rows(columns, id_column, outerjoins)
+    if export_format == "csv":
+        return StreamingResponse(csv_stream(columns, batches), media_type="text/csv; charset=utf-8",
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'})
+    return StreamingResponse(ndjson_stream(columns, batches), media_type="application/x-ndjson")
+
+BOOKING_EXPORT_JOINS = [
+    (Guest, Guest.id == Booking.guest_id),
+    (Room, Room.id == Booking.room_id),
+    (RoomType, RoomType.id == Room.type_id),
+]
+
+@router.get("/export/bookings.{export_format}")
+def export_bookings(export_format: str = Path(..., pattern="^(ndjson|csv)$")):
+    return export_response(BOOKING_READ_COLUMNS, Booking.id, export_format, "bookings", BOOKING_EXPORT_JOINS)
+
+@router.get("/export/payments.{export_format}")
+def export_payments(export_format: str = Path(..., pattern="^(ndjson|csv)$")):
+    return export_response(PAYMENT_COLUMNS, Payment.id, export_format, "payments")
+
+# Схема бази оновлюється при старті процесу, а рушій закривається при його зупинці
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Бази, створені раніше, отримують нові колонки (version тощо) та індекси, як і в CLI та інтерфейсі
+    upgrade_schema(database.get_engine())
+    yield
+    await database.dispose_engines()
+
+# База зайнята іншим процесом довше, ніж тривають повтори: клієнт може повторити запит пізніше
+async def database_busy(request, error: OperationalError):
+    if not database.is_busy(error):
+        raise error
+    return JSONResponse(status_code=503, content={"detail": "База даних зайнята, спробуйте ще раз"},
+                        headers={"Retry-After": "1"})
+
+# Запис змінили між читанням і збереженням: UPDATE/DELETE не знайшов очікуваної версії
+async def version_conflict(request, error: StaleDataError):
+    return JSONResponse(status_code=409, content={"detail": "Запис змінено іншим користувачем, оновіть дані"})
+
+def create_app():
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    app.add_exception_handler(OperationalError, database_busy)
+    app.add_exception_handler(StaleDataError, version_conflict)
+    return app
+
+app = create_app()
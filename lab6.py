@@ -1,18 +1,134 @@
 import streamlit as st
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from Lab4 import Base  # твій файл з моделями
+from sqlalchemy.orm.exc import StaleDataError
+from Lab4 import Base, upgrade_schema  # твій файл з моделями
+from db import SessionLocal, get_engine
 from Lab4 import (Hotel, Guest, RoomType, Room, Service, GuestService,
-                  Position, Staff, Booking, Payment, RoomStatus, BookingStatus, PaymentMethod)
+                  Position, Staff, Booking, Payment, RoomStatus, BookingStatus, PaymentMethod,
+                  book_room_nights, move_room_nights, peak_room_nights, compute_invoice)
+import collections
 import datetime
-
-# Підключення до БД
-engine = create_engine('sqlite:///hotel\hotel_management.db')
-Session = sessionmaker(bind=engine)
-session = Session()
-
-# Створення таблиць
-Base.metadata.create_all(engine)
+import enum
+
+# Підключення до БД: рушій процесу з модуля db, спільний для всіх сесій браузера.
+# Створення таблиць та індексів виконується один раз на процес
+@st.cache_resource(show_spinner=False)
+def prepare_database():
+    upgrade_schema(get_engine())
+
+prepare_database()
+
+# Нова сесія на кожен перезапуск скрипта. Сесія попереднього перезапуску закривається тут,
+# навіть якщо його перервали st.rerun() чи st.stop()
+if "db_session" in st.session_state:
+    st.session_state.db_session.close()
+session = st.session_state.db_session = SessionLocal()
+
+# Довідкові списки для selectbox кешуються за версією таблиці. Лічильники версій спільні
+# для всіх сесій процесу: запис через форми застосунку збільшує версію лише своєї таблиці.
+# TTL обмежує застарілість даних, змінених поза застосунком (API, консоль)
+REFERENCE_TTL = 60
+
+@st.cache_resource(show_spinner=False)
+def table_versions():
+    return collections.defaultdict(int)
+
+def bump(*tables):
+    versions = table_versions()
+    for table in tables:
+        versions[table] += 1
+
+# Оптимістичне блокування у формах: версія запису запам'ятовується при показі форми.
+# Якщо при збереженні версія в базі інша, запис змінили після показу (API, інша вкладка),
+# і зміни не зберігаються поверх чужих
+def seen_version(key, row):
+    state_key = f"{key}_version_{row.id}"
+    seen = st.session_state.get(state_key, row.version)
+    st.session_state[state_key] = row.version
+    return seen
+
+def commit_versioned(key, row, seen):
+    """Зберігає зміни, якщо запис не змінювали після показу форми. Повертає False при конфлікті."""
+    try:
+        if row.version != seen:
+            raise StaleDataError()
+        deleted = row in session.deleted
+        session.commit()
+    except StaleDataError:
+        session.rollback()
+        st.error("Запис змінено іншим користувачем. Дані оновлено, повторіть зміни.")
+        return False
+    if not deleted:
+        st.session_state[f"{key}_version_{row.id}"] = row.version
+    return True
+
+# Посторінковий перегляд: сортування, фільтр та LIMIT/OFFSET виконуються в базі,
+# у браузер передається лише поточна сторінка
+PAGE_SIZES = [25, 50, 100]
+
+def show_page(key, query, sort_columns):
+    """Показує сторінку запиту з мітками колонок. sort_columns — {назва: колонка}, перша
+    використовується за замовчуванням, "ID" — для стабільного порядку. Повертає False, якщо запит порожній."""
+    total = query.order_by(None).count()
+    if not total:
+        return False
+    col_sort, col_order, col_size, col_page = st.columns(4)
+    sort_name = col_sort.selectbox("Сортувати за", list(sort_columns), key=f"{key}_sort")
+    descending = col_order.checkbox("За спаданням", key=f"{key}_desc")
+    page_size = col_size.selectbox("Рядків на сторінці", PAGE_SIZES, key=f"{key}_size")
+    pages = (total + page_size - 1) // page_size
+    page = min(col_page.number_input(f"Сторінка (з {pages})", min_value=1, step=1, key=f"{key}_page"), pages)
+
+    column = sort_columns[sort_name]
+    rows = query.order_by(column.desc() if descending else column.asc(), sort_columns["ID"]) \
+        .limit(page_size).offset((page - 1) * page_size).all()
+    st.dataframe(
+        [{name: value.value if isinstance(value, enum.Enum) else value for name, value in row._mapping.items()}
+         for row in rows],
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption(f"Всього записів: {total}")
+    return True
+
+@st.cache_data(show_spinner=False, ttl=REFERENCE_TTL)
+def load_guests(version):
+    with SessionLocal() as s:
+        return s.query(Guest.id, Guest.name).order_by(Guest.id).all()
+
+@st.cache_data(show_spinner=False, ttl=REFERENCE_TTL)
+def load_room_types(version):
+    with SessionLocal() as s:
+        return s.query(RoomType.id, RoomType.type).order_by(RoomType.id).all()
+
+@st.cache_data(show_spinner=False, ttl=REFERENCE_TTL)
+def load_free_rooms(version):
+    with SessionLocal() as s:
+        return s.query(Room.id, RoomType.type, Room.price_per_night) \
+            .join(RoomType, RoomType.id == Room.type_id) \
+            .filter(Room.status == RoomStatus.Вільний).order_by(Room.id).all()
+
+# Списки для вибору запису у вкладках редагування: лише id та поля підпису, а не вся таблиця
+@st.cache_data(show_spinner=False, ttl=REFERENCE_TTL)
+def load_bookings(version):
+    with SessionLocal() as s:
+        return s.query(Booking.id, Booking.guest_id, Booking.room_id).order_by(Booking.id).all()
+
+@st.cache_data(show_spinner=False, ttl=REFERENCE_TTL)
+def load_payments(version):
+    with SessionLocal() as s:
+        return s.query(Payment.id, Payment.booking_id).order_by(Payment.id).all()
+
+@st.cache_data(show_spinner=False, ttl=REFERENCE_TTL)
+def load_positions(version):
+    with SessionLocal() as s:
+        return s.query(Position.id, Position.title, Position.level, Position.department).order_by(Position.id).all()
+
+@st.cache_data(show_spinner=False, ttl=REFERENCE_TTL)
+def load_services(version):
+    with SessionLocal() as s:
+        return s.query(Service.id, Service.name, Service.price).order_by(Service.id).all()
+
+versions = table_versions()
 
 # Головне меню Streamlit
 st.set_page_config(page_title="Система управління готелем", layout="wide")
@@ -66,40 +182,31 @@ elif menu == "Меню гостей":
                 guest = Guest(name=name, age=age, phone=phone, email=email, passport=passport)
                 session.add(guest)
                 session.commit()
+                bump("guest")
                 st.success("✅ Гість доданий успішно")
 
+    guest_columns = {"ID": Guest.id, "ПІБ": Guest.name, "Вік": Guest.age}
+    guest_query = session.query(
+        Guest.id.label("ID"), Guest.name.label("ПІБ"), Guest.age.label("Вік"),
+        Guest.phone.label("Телефон"), Guest.email.label("Email"), Guest.passport.label("Паспорт")
+    )
+
     # 📋 Перегляд усіх гостей + сортування
     with tab2:
-        sort = st.checkbox("Сортувати за віком", value=False)
-        guests = session.query(Guest).order_by(Guest.age if sort else Guest.id).all()
-        if guests:
-            for g in guests:
-                st.markdown(f"""
-                **ID:** {g.id} | **ПІБ:** {g.name} | **Вік:** {g.age}  
-                📞 {g.phone} | ✉️ {g.email} | 🆔 {g.passport}
-                ---""")
-        else:
+        if not show_page("guests", guest_query, guest_columns):
             st.info("Гостей не знайдено.")
 
     # 🔍 Пошук гостей
     with tab3:
         keyword = st.text_input("Пошук за ПІБ або телефоном")
         if keyword:
-            results = session.query(Guest).filter(
-                (Guest.name.contains(keyword)) | (Guest.phone.contains(keyword))
-            ).all()
-            if results:
-                for g in results:
-                    st.markdown(f"""
-                    **ID:** {g.id} | **ПІБ:** {g.name} | **Вік:** {g.age}  
-                    📞 {g.phone} | ✉️ {g.email} | 🆔 {g.passport}
-                    ---""")
-            else:
+            results = guest_query.filter((Guest.name.contains(keyword)) | (Guest.phone.contains(keyword)))
+            if not show_page("guests_search", results, guest_columns):
                 st.warning("Гостей не знайдено.")
 
     # ⚙️ Редагування та видалення
     with tab4:
-        guests = session.query(Guest).all()
+        guests = load_guests(versions["guest"])
         guest_ids = {f"{g.id} - {g.name}": g.id for g in guests}
         selected = st.selectbox("Оберіть гостя для редагування/видалення", list(guest_ids.keys()))
         guest_id = guest_ids[selected]
@@ -119,11 +226,13 @@ elif menu == "Меню гостей":
                 guest.email = new_email
                 guest.passport = new_passport
                 session.commit()
+                bump("guest")
                 st.success("✅ Дані оновлено")
 
         if st.button("🗑️ Видалити цього гостя"):
             session.delete(guest)
             session.commit()
+            bump("guest")
             st.success("🗑️ Гість видалений")
             st.experimental_rerun()
 
@@ -152,44 +261,31 @@ elif menu == "Меню типів кімнат":
                 rt = RoomType(type=room_type, price=price, max_guests=max_guests)
                 session.add(rt)
                 session.commit()
+                bump("room_type")
                 st.success("✅ Тип кімнати додано.")
 
+    room_type_columns = {"ID": RoomType.id, "Ціна": RoomType.price, "Макс. гостей": RoomType.max_guests}
+    room_type_query = session.query(
+        RoomType.id.label("ID"), RoomType.type.label("Тип"),
+        RoomType.price.label("Ціна за ніч"), RoomType.max_guests.label("Макс. гостей")
+    )
+
     # 📋 Перегляд усіх + сортування
     with tab2:
-        sort_by = st.radio("Сортувати за:", ["ID", "Ціна", "Макс. гостей"], horizontal=True)
-        if sort_by == "Ціна":
-            room_types = session.query(RoomType).order_by(RoomType.price).all()
-        elif sort_by == "Макс. гостей":
-            room_types = session.query(RoomType).order_by(RoomType.max_guests).all()
-        else:
-            room_types = session.query(RoomType).order_by(RoomType.id).all()
-
-        if room_types:
-            for t in room_types:
-                st.markdown(f"""
-                **ID:** {t.id} | **Тип:** {t.type}  
-                💰 {t.price} / ніч | 👥 Макс. гостей: {t.max_guests}
-                ---""")
-        else:
+        if not show_page("room_types", room_type_query, room_type_columns):
             st.info("Типи кімнат не знайдені.")
 
     # 🔍 Пошук типу
     with tab3:
         keyword = st.text_input("Введіть тип кімнати для пошуку")
         if keyword:
-            results = session.query(RoomType).filter(RoomType.type.ilike(f"%{keyword}%")).all()
-            if results:
-                for t in results:
-                    st.markdown(f"""
-                    **ID:** {t.id} | **Тип:** {t.type}  
-                    💰 {t.price} / ніч | 👥 Макс. гостей: {t.max_guests}
-                    ---""")
-            else:
+            results = room_type_query.filter(RoomType.type.ilike(f"%{keyword}%"))
+            if not show_page("room_types_search", results, room_type_columns):
                 st.warning("❌ Нічого не знайдено.")
 
     # ⚙️ Редагування / видалення
     with tab4:
-        all_types = session.query(RoomType).all()
+        all_types = load_room_types(versions["room_type"])
         if all_types:
             options = {f"{t.id} - {t.type}": t.id for t in all_types}
             selected = st.selectbox("Оберіть тип для редагування або видалення", list(options.keys()))
@@ -207,11 +303,13 @@ elif menu == "Меню типів кімнат":
                     rt.price = new_price
                     rt.max_guests = new_max_guests
                     session.commit()
+                    bump("room_type", "room")
                     st.success("✅ Дані оновлено")
 
             if st.button("🗑️ Видалити цей тип кімнати"):
                 session.delete(rt)
                 session.commit()
+                bump("room_type", "room")
                 st.success("🗑️ Тип кімнати видалено")
                 st.experimental_rerun()
         else:
@@ -223,7 +321,7 @@ elif menu == "Меню кімнат":
     tab1, tab2, tab3 = st.tabs(["➕ Додати", "📋 Переглянути", "⚙️ Редагувати / Видалити"])
 
     # Отримання всіх типів кімнат
-    room_types = session.query(RoomType).all()
+    room_types = load_room_types(versions["room_type"])
     type_dict = {f"{t.type} (ID {t.id})": t.id for t in room_types}
     status_options = {status.name: status.value for status in RoomStatus}
 
@@ -247,6 +345,7 @@ elif menu == "Меню кімнат":
                     )
                     session.add(new_room)
                     session.commit()
+                    bump("room")
                     st.success("✅ Кімната додана!")
 
     # 📋 Перегляд
@@ -269,6 +368,7 @@ elif menu == "Меню кімнат":
             selected = st.selectbox("Оберіть кімнату для редагування або видалення", list(options.keys()))
             room_id = options[selected]
             room = session.query(Room).get(room_id)
+            room_version = seen_version("room", room)
 
             with st.form("edit_room_form"):
                 new_type = st.selectbox("Тип", list(type_dict.keys()), index=list(type_dict.values()).index(room.type_id))
@@ -280,12 +380,14 @@ elif menu == "Меню кімнат":
                     room.type_id = type_dict[new_type]
                     room.status = RoomStatus[new_status]
                     room.price_per_night = new_price
-                    session.commit()
-                    st.success("✅ Кімната оновлена!")
+                    if commit_versioned("room", room, room_version):
+                        bump("room")
+                        st.success("✅ Кімната оновлена!")
 
             if st.button("🗑️ Видалити цю кімнату"):
                 session.delete(room)
                 session.commit()
+                bump("room")
                 st.success("🗑️ Кімната видалена")
                 st.experimental_rerun()
         else:
@@ -295,7 +397,7 @@ elif menu == "Меню посад":
     st.subheader("🏢 Меню посад")
 
     # Отримуємо всі посади для відображення і вибору
-    positions = session.query(Position).all()
+    positions = load_positions(versions["position"])
     pos_dict = {f"{p.title} (ID {p.id})": p.id for p in positions}
 
     tab_add, tab_view, tab_edit = st.tabs(["➕ Додати", "📋 Переглянути / Пошук", "⚙️ Редагувати / Видалити"])
@@ -315,6 +417,7 @@ elif menu == "Меню посад":
                     new_pos = Position(title=title.strip(), level=level.strip(), department=department.strip())
                     session.add(new_pos)
                     session.commit()
+                    bump("position")
                     st.success("✅ Посаду додано.")
                     st.rerun()
 
@@ -354,19 +457,21 @@ elif menu == "Меню посад":
                     pos.level = new_level.strip() or pos.level
                     pos.department = new_department.strip() or pos.department
                     session.commit()
+                    bump("position")
                     st.success("✅ Посаду оновлено.")
                     st.experimental_rerun()
 
             if st.button("🗑️ Видалити цю посаду"):
                 session.delete(pos)
                 session.commit()
+                bump("position")
                 st.success("🗑️ Посаду видалено.")
                 st.experimental_rerun()
 
 elif menu == "Меню персоналу":
     st.subheader("👥 Меню персоналу")
 
-    positions = session.query(Position).all()
+    positions = load_positions(versions["position"])
     pos_dict = {f"{p.title} (ID {p.id})": p.id for p in positions}
 
     hotel = session.query(Hotel).first()
@@ -477,7 +582,7 @@ elif menu == "Меню персоналу":
 elif menu == "Меню послуг":
     st.subheader("🛎️ Меню послуг")
 
-    services = session.query(Service).all()
+    services = load_services(versions["service"])
     service_dict = {f"{s.name} (ID {s.id})": s.id for s in services}
 
     tab_add, tab_view, tab_edit, tab_sort = st.tabs(["➕ Додати", "📋 Переглянути / Пошук", "⚙️ Редагувати / Видалити", "🔽 Сортувати за ціною"])
@@ -498,6 +603,7 @@ elif menu == "Меню послуг":
                         new_service = Service(name=name.strip(), price=price_val)
                         session.add(new_service)
                         session.commit()
+                        bump("service")
                         st.success("✅ Послугу додано.")
                         st.rerun()
                     except ValueError:
@@ -539,6 +645,7 @@ elif menu == "Меню послуг":
                             service.name = new_name.strip()
                             service.price = float(new_price)
                             session.commit()
+                            bump("service")
                             st.success("✅ Послугу оновлено.")
                             st.experimental_rerun()
                         except ValueError:
@@ -547,6 +654,7 @@ elif menu == "Меню послуг":
             if st.button("🗑️ Видалити послугу"):
                 session.delete(service)
                 session.commit()
+                bump("service")
                 st.success("🗑️ Послугу видалено.")
                 st.experimental_rerun()
 
@@ -562,11 +670,11 @@ elif menu == "Меню послуг":
 elif menu == "Меню бронювань":
     st.subheader("📅 Меню бронювань")
 
-    guests = session.query(Guest).all()
+    guests = load_guests(versions["guest"])
     guest_dict = {f"{g.name} (ID {g.id})": g.id for g in guests}
 
-    rooms = session.query(Room).filter(Room.status == RoomStatus.Вільний).all()
-    room_dict = {f"Тип: {r.type.type}, Ціна: {r.price_per_night}, ID: {r.id}": r.id for r in rooms}
+    rooms = load_free_rooms(versions["room"])
+    room_dict = {f"Тип: {r.type}, Ціна: {r.price_per_night}, ID: {r.id}": r.id for r in rooms}
 
     tab_add, tab_view, tab_edit, tab_sort = st.tabs(["➕ Додати", "📋 Переглянути / Пошук", "⚙️ Редагувати / Видалити", "🔽 Сортувати за заїздом"])
 
@@ -592,12 +700,7 @@ elif menu == "Меню бронювань":
                         st.error("Дата виїзду повинна бути пізніше дати заїзду.")
                     else:
                         # Перевірка зайнятості кімнати
-                        overlapping = session.query(Booking).filter(
-                            Booking.room_id == room_id,
-                            Booking.status == BookingStatus.Активно,
-                            Booking.check_out > check_in_str,
-                            Booking.check_in < check_out_str
-                        ).count()
+                        overlapping = peak_room_nights(session, room_id, check_in_str, check_out_str)
                         room_obj = session.query(Room).get(room_id)
                         max_guests = room_obj.type.max_guests
 
@@ -613,37 +716,33 @@ elif menu == "Меню бронювань":
                                 price_per_night=room_obj.price_per_night
                             )
                             session.add(booking)
+                            book_room_nights(session, room_id, check_in_str, check_out_str)
                             if overlapping + 1 >= max_guests:
                                 room_obj.status = RoomStatus.Зайнятий
                             session.commit()
+                            bump("room", "booking")
                             st.success("✅ Бронювання успішно створено.")
                             st.rerun()
 
+    booking_columns = {"ID": Booking.id, "Заїзд": Booking.check_in, "Виїзд": Booking.check_out, "Гість": Guest.name}
+    booking_query = session.query(
+        Booking.id.label("ID"), Guest.name.label("Гість"), RoomType.type.label("Кімната"),
+        Booking.check_in.label("Заїзд"), Booking.check_out.label("Виїзд"),
+        Booking.status.label("Статус"), Booking.price_per_night.label("Ціна за ніч")
+    ).outerjoin(Guest, Guest.id == Booking.guest_id) \
+     .outerjoin(Room, Room.id == Booking.room_id) \
+     .outerjoin(RoomType, RoomType.id == Room.type_id)
+
     # 📋 Переглянути / Пошук бронювань
     with tab_view:
         keyword = st.text_input("Пошук бронювань за ім'ям гостя")
-        if keyword:
-            guests_found = session.query(Guest).filter(Guest.name.ilike(f"%{keyword}%")).all()
-            guest_ids = [g.id for g in guests_found]
-            bookings = session.query(Booking).filter(Booking.guest_id.in_(guest_ids)).all()
-        else:
-            bookings = session.query(Booking).all()
-
-        if bookings:
-            for b in bookings:
-                guest = session.query(Guest).get(b.guest_id)
-                room = session.query(Room).get(b.room_id)
-                st.markdown(
-                    f"**ID:** {b.id} | Гість: {guest.name if guest else 'Видалено'} | "
-                    f"Кімната: {room.type.type if room else 'Видалено'} | "
-                    f"Заїзд: {b.check_in} | Виїзд: {b.check_out} | Статус: {b.status.value} | Ціна за ніч: {b.price_per_night}"
-                )
-        else:
+        results = booking_query.filter(Guest.name.ilike(f"%{keyword}%")) if keyword else booking_query
+        if not show_page("bookings", results, booking_columns):
             st.info("Бронювання не знайдено.")
 
     # ⚙️ Редагувати / Видалити бронювання
     with tab_edit:
-        bookings_all = session.query(Booking).all()
+        bookings_all = load_bookings(versions["booking"])
         if not bookings_all:
             st.info("Бронювання відсутні.")
         else:
@@ -651,6 +750,11 @@ elif menu == "Меню бронювань":
             selected_booking_key = st.selectbox("Оберіть бронювання для редагування", list(booking_dict.keys()))
             booking_id = booking_dict[selected_booking_key]
             booking = session.query(Booking).get(booking_id)
+            if booking is None:
+                # Бронювання видалили поза інтерфейсом, а список ще з кешу
+                bump("booking")
+                st.rerun()
+            booking_version = seen_version("booking", booking)
 
             with st.form("edit_booking_form"):
                 new_status = st.selectbox("Статус бронювання", list(BookingStatus), index=list(BookingStatus).index(booking.status))
@@ -662,44 +766,43 @@ elif menu == "Меню бронювань":
                     if new_check_out <= new_check_in:
                         st.error("Дата виїзду повинна бути пізніше дати заїзду.")
                     else:
+                        was_active = booking.status == BookingStatus.Активно
+                        old_check_in, old_check_out = booking.check_in, booking.check_out
                         booking.status = new_status
                         booking.check_in = new_check_in
                         booking.check_out = new_check_out
-                        session.commit()
-                        st.success("✅ Бронювання оновлено.")
-                        st.experimental_rerun()
+                        if not move_room_nights(session, booking, was_active, old_check_in, old_check_out):
+                            session.rollback()
+                            st.error("Кімната вже зайнята на ці дати.")
+                        elif commit_versioned("booking", booking, booking_version):
+                            st.success("✅ Бронювання оновлено.")
+                            st.experimental_rerun()
 
             if st.button("🗑️ Видалити бронювання"):
                 room_obj = session.query(Room).get(booking.room_id)
                 if room_obj:
                     room_obj.status = RoomStatus.Вільний
+                if booking.status == BookingStatus.Активно:
+                    book_room_nights(session, booking.room_id, booking.check_in, booking.check_out, -1)
                 session.delete(booking)
-                session.commit()
-                st.success("🗑️ Бронювання видалено.")
-                st.experimental_rerun()
+                if commit_versioned("booking", booking, booking_version):
+                    bump("room", "booking")
+                    st.success("🗑️ Бронювання видалено.")
+                    st.experimental_rerun()
 
     # 🔽 Сортування бронювань за датою заїзду
     with tab_sort:
-        sorted_bookings = session.query(Booking).order_by(Booking.check_in).all()
-        if sorted_bookings:
-            for b in sorted_bookings:
-                guest = session.query(Guest).get(b.guest_id)
-                room = session.query(Room).get(b.room_id)
-                st.markdown(
-                    f"**ID:** {b.id} | Гість: {guest.name if guest else 'Видалено'} | "
-                    f"Кімната: {room.type.type if room else 'Видалено'} | "
-                    f"Заїзд: {b.check_in} | Виїзд: {b.check_out} | Статус: {b.status.value}"
-                )
-        else:
+        by_check_in = {"Заїзд": Booking.check_in, **booking_columns}
+        if not show_page("bookings_sorted", booking_query, by_check_in):
             st.info("Бронювання не знайдено.")
 
 elif menu == "Меню послуг гостей":
     st.subheader("🛎️ Меню Гість-Сервіс")
 
-    guests = session.query(Guest).all()
+    guests = load_guests(versions["guest"])
     guest_dict = {f"{g.name} (ID {g.id})": g.id for g in guests}
 
-    services = session.query(Service).all()
+    services = load_services(versions["service"])
     service_dict = {f"{s.name} (ID {s.id})": s.id for s in services}
 
     tab_add, tab_view, tab_search, tab_edit, tab_delete = st.tabs([
@@ -720,13 +823,14 @@ elif menu == "Меню послуг гостей":
             with st.form("add_guest_service_form"):
                 selected_guest = st.selectbox("Оберіть гостя", list(guest_dict.keys()))
                 selected_service = st.selectbox("Оберіть послугу", list(service_dict.keys()))
+                service_date = st.date_input("Дата надання послуги", datetime.date.today())
                 submitted = st.form_submit_button("Додати послугу")
 
                 if submitted:
                     guest_id = guest_dict[selected_guest]
                     service_id = service_dict[selected_service]
 
-                    gs = GuestService(guest_id=guest_id, service_id=service_id)
+                    gs = GuestService(guest_id=guest_id, service_id=service_id, date=service_date)
                     session.add(gs)
                     session.commit()
                     st.success("✅ Послуга гостю додана.")
@@ -784,6 +888,7 @@ elif menu == "Меню послуг гостей":
                     list(service_dict.keys()),
                     index=list(service_dict.values()).index(gs.service_id) if gs.service_id in service_dict.values() else 0
                 )
+                new_date = st.date_input("Дата надання послуги", gs.date or datetime.date.today())
                 update_btn = st.form_submit_button("Оновити")
 
                 if update_btn:
@@ -846,20 +951,17 @@ elif menu == "Меню оплат":
                 booking_id = booking_dict[selected_booking]
                 booking = session.query(Booking).get(booking_id)
 
-                num_nights = (booking.check_out - booking.check_in).days
-                room_cost = num_nights * booking.price_per_night
-
-                guest_services = session.query(GuestService).filter_by(guest_id=booking.guest_id).all()
-                service_cost = 0
-                for gs in guest_services:
-                    service = session.query(Service).get(gs.service_id)
-                    if service:
-                        service_cost += service.price
-
-                total_amount = room_cost + service_cost
-
-                st.markdown(f"Ціна за номер: **{room_cost} грн**")
-                st.markdown(f"Ціна за сервіси: **{service_cost} грн**")
+                invoice = compute_invoice(session, booking)
+                total_amount = invoice.total
+
+                st.markdown(f"Ціна за номер: **{invoice.room_cost} грн** "
+                            f"({invoice.nights} ноч. x {invoice.price_per_night} грн)")
+                if invoice.services:
+                    st.table([{
+                        "Послуга": line.name, "Ціна, грн": line.price,
+                        "Кількість": line.quantity, "Сума, грн": line.amount
+                    } for line in invoice.services])
+                st.markdown(f"Ціна за сервіси: **{invoice.service_cost} грн**")
                 st.markdown(f"Загальна сума до сплати: **{total_amount} грн**")
 
                 payment_method = st.selectbox("Спосіб оплати", [m.value for m in PaymentMethod])
@@ -876,20 +978,20 @@ elif menu == "Меню оплат":
                     )
                     session.add(payment)
                     session.commit()
+                    bump("payment")
                     st.success("✅ Оплату додано.")
                     st.rerun()
 
+    payment_columns = {"ID": Payment.id, "Дата": Payment.date, "Сума": Payment.amount}
+    payment_query = session.query(
+        Payment.id.label("ID"), Payment.booking_id.label("Бронювання ID"), Payment.amount.label("Сума, грн"),
+        Payment.date.label("Дата"), Payment.method.label("Метод")
+    )
+
     # 📋 Переглянути всі оплати
     with tab_view:
-        payments = session.query(Payment).all()
-        if not payments:
+        if not show_page("payments", payment_query, payment_columns):
             st.info("Оплати не знайдені.")
-        else:
-            for p in payments:
-                st.markdown(
-                    f"**ID:** {p.id} | Бронювання ID: {p.booking_id} | "
-                    f"Сума: {p.amount} грн | Дата: {p.date} | Метод: {p.method.value}"
-                )
 
     # 🔍 Пошук оплат
     with tab_find:
@@ -897,21 +999,16 @@ elif menu == "Меню оплат":
         if booking_id_input:
             try:
                 booking_id = int(booking_id_input)
-                payments = session.query(Payment).filter_by(booking_id=booking_id).all()
-                if payments:
-                    for p in payments:
-                        st.markdown(
-                            f"**ID:** {p.id} | Бронювання ID: {p.booking_id} | "
-                            f"Сума: {p.amount} грн | Дата: {p.date} | Метод: {p.method.value}"
-                        )
-                else:
+                results = payment_query.filter(Payment.booking_id == booking_id)
+                if not show_page("payments_search", results, payment_columns):
                     st.info("Оплати не знайдені.")
             except ValueError:
                 st.error("Невірний формат ID бронювання.")
+                st.error("Невірний формат ID бронювання.")
 
     # ⚙️ Редагувати оплату
     with tab_edit:
-        payments_all = session.query(Payment).all()
+        payments_all = load_payments(versions["payment"])
         if not payments_all:
             st.info("Оплати відсутні.")
         else:
@@ -919,6 +1016,11 @@ elif menu == "Меню оплат":
             selected_payment_key = st.selectbox("Оберіть оплату для редагування", list(payment_dict.keys()))
             payment_id = payment_dict[selected_payment_key]
             payment = session.query(Payment).get(payment_id)
+            if payment is None:
+                # Оплату видалили поза інтерфейсом, а список ще з кешу
+                bump("payment")
+                st.rerun()
+            payment_version = seen_version("payment", payment)
 
             with st.form("edit_payment_form"):
                 new_amount = st.number_input("Сума", value=payment.amount, min_value=0.0, format="%.2f")
@@ -930,13 +1032,13 @@ elif menu == "Меню оплат":
                     payment.amount = new_amount
                     payment.date = new_date
                     payment.method = PaymentMethod(new_method)
-                    session.commit()
-                    st.success("✅ Оплату оновлено.")
-                    st.experimental_rerun()
+                    if commit_versioned("payment", payment, payment_version):
+                        st.success("✅ Оплату оновлено.")
+                        st.experimental_rerun()
 
     # 🗑️ Видалити оплату
     with tab_delete:
-        payments_all = session.query(Payment).all()
+        payments_all = load_payments(versions["payment"])
         if not payments_all:
             st.info("Оплати відсутні.")
         else:
@@ -944,12 +1046,16 @@ elif menu == "Меню оплат":
             selected_payment_key = st.selectbox("Оберіть оплату для видалення", list(payment_dict.keys()))
             payment_id = payment_dict[selected_payment_key]
             payment = session.query(Payment).get(payment_id)
+            if payment is None:
+                # Оплату видалили поза інтерфейсом, а список ще з кешу
+                bump("payment")
+                st.rerun()
 
             if st.button("🗑️ Видалити оплату"):
                 session.delete(payment)
                 session.commit()
+                bump("payment")
                 st.success("🗑️ Оплату видалено.")
                 st.experimental_rerun()
 
-
-
+session.close()
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from hotel import db
+from hotel.db import SQLITE_PRAGMAS, create_hotel_engine, create_hotel_async_engine
+from hotel.Lab4 import Base, Guest
+
+def test_engine_applies_pragma_profile(tmp_path):
+    engine = create_hotel_engine(f"sqlite:///{tmp_path / 'hotel.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == SQLITE_PRAGMAS["busy_timeout"]
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+    engine.dispose()
+
+def test_engine_without_profile_keeps_defaults(tmp_path):
+    engine = create_hotel_engine(f"sqlite:///{tmp_path / 'hotel.db'}", pragmas={})
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    engine.dispose()
+
+def test_async_engine_applies_pragma_profile(tmp_path):
+    async def cache_size():
+        engine = create_hotel_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'hotel.db'}", pragmas={"cache_size": -1000})
+        async with engine.connect() as conn:
+            size = (await conn.execute(text("PRAGMA cache_size"))).scalar()
+        await engine.dispose()
+        return size
+    assert asyncio.run(cache_size()) == -1000
+
+def test_engine_is_created_lazily_once_per_process(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOTEL_DATABASE_URL", f"sqlite:///{tmp_path / 'env.db'}")
+    db.configure()
+    assert db._engine is None
+    with db.SessionLocal() as session:
+        session.execute(text("SELECT 1"))
+    assert db.get_engine() is db._engine
+    assert str(db.get_engine().url).endswith("env.db")
+    db.configure()
+
+def test_session_scope_commits_or_rolls_back(tmp_path):
+    db.configure(f"sqlite:///{tmp_path / 'hotel.db'}")
+    Base.metadata.create_all(db.get_engine())
+    with db.session_scope() as session:
+        session.add(Guest(name="Іван"))
+    with pytest.raises(RuntimeError):
+        with db.session_scope() as session:
+            session.add(Guest(name="Петро"))
+            session.flush()
+            raise RuntimeError
+    with db.session_scope() as session:
+        assert [g.name for g in session.query(Guest)] == ["Іван"]
+    db.configure()
+
+def test_long_lived_session_sees_other_writers(tmp_path):
+    # Меню CLI тримає одну сесію: після запису з API вона має бачити новий рядок і могти писати сама
+    db.configure(f"sqlite:///{tmp_path / 'hotel.db'}")
+    Base.metadata.create_all(db.get_engine())
+    cli = db.SessionLocal()
+    assert cli.query(Guest).count() == 0
+    with db.session_scope() as other:
+        other.add(Guest(name="Іван"))
+    assert cli.query(Guest).count() == 1
+    cli.add(Guest(name="Петро"))
+    cli.commit()
+    cli.close()
+    with db.session_scope() as session:
+        db.begin_immediate(session)
+        session.add(Guest(name="Олена"))
+    with db.session_scope() as session:
+        assert session.query(Guest).count() == 3
+    db.configure()
+
+def test_engine_pool_is_sized(tmp_path):
+    db.configure(f"sqlite:///{tmp_path / 'hotel.db'}")
+    pool = db.get_engine().pool
+    assert (pool.size(), pool._max_overflow) == (db.POOL_SIZE, db.MAX_OVERFLOW)
+    db.configure()
+
+def test_lab4_uses_package_db():
+    from hotel import Lab4
+    assert Lab4.hotel_db() is db
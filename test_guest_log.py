@@ -0,0 +1,158 @@
+import datetime
+import os
+import threading
+import time
+from hotel import guest_log
+from hotel.guest_log import GuestLogWriter, GuestRecord
+
+def record(passport):
+    return GuestRecord(name=f"Гість {passport}", age=30, phone="+380501", passport=passport, room_type="Стандарт",
+                       check_in=datetime.date(2025, 4, 24), check_out=datetime.date(2025, 4, 30),
+                       amount=300, method="готівка")
+
+def passports(path):
+    with open(path, "rb") as stream:
+        return [entry.record.passport for entry in guest_log.read_entries(stream)]
+
+def test_writer_flushes_in_batches(tmp_path):
+    path = tmp_path / "guest_data.txt"
+    with GuestLogWriter(path, flush_records=3) as log:
+        log.write_record(record("1"))
+        log.write_record(record("2"))
+        assert path.read_bytes() == b""
+        log.write_record(record("3"))
+        assert passports(path) == ["1", "2", "3"]
+        log.write_record(record("4"))
+    assert passports(path) == ["1", "2", "3", "4"]
+
+def test_writer_flushes_after_interval(tmp_path):
+    path = tmp_path / "guest_data.txt"
+    with GuestLogWriter(path, flush_records=100, flush_interval=0.05, fsync="flush") as log:
+        log.write_record(record("1"))
+        deadline = time.monotonic() + 5
+        while not path.read_bytes() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert passports(path) == ["1"]
+
+def test_concurrent_writers_do_not_interleave(tmp_path):
+    path = tmp_path / "guest_data.txt"
+
+    def kiosk(number):
+        with GuestLogWriter(path) as log:
+            for i in range(200):
+                log.write_record(record(f"{number}-{i}"))
+
+    threads = [threading.Thread(target=kiosk, args=(number,)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(path, "rb") as stream:
+        entries = list(guest_log.read_entries(stream))
+    assert len(entries) == 800 and not any(entry.error for entry in entries)
+    assert sorted(entry.record.passport for entry in entries) == sorted(f"{n}-{i}" for n in range(4) for i in range(200))
+
+def test_jsonl_log_lookup_by_index(tmp_path):
+    path = tmp_path / "guest_data.jsonl"
+    with GuestLogWriter(path, flush_records=2, fmt="jsonl", index=True) as log:
+        for passport in ["1", "2", "1", "3", "1"]:
+            log.write_record(record(passport))
+    with open(path, "rb") as stream:
+        assert [entry.record for entry in guest_log.read_json_entries(stream)] == \
+            [record(p) for p in ["1", "2", "1", "3", "1"]]
+    assert len(open(guest_log.index_path(path)).readlines()) == 5
+
+    log = guest_log.GuestLog(path)
+    assert log.lookup("1") == [record("1")] * 3
+    assert log.lookup("2") == [record("2")]
+    assert log.lookup("404") == []
+    assert len(log.lookup_phone("+380501")) == 5
+
+def test_lookup_indexes_unindexed_records(tmp_path):
+    path = tmp_path / "guest_data.txt"
+    with GuestLogWriter(path) as log:  # текстовий журнал без індексу, як пише lab3
+        log.write_record(record("1"))
+        log.write_record(record("2"))
+    log = guest_log.GuestLog(path)
+    assert log.lookup("2") == [record("2")]
+
+    with GuestLogWriter(path, index=True) as writer:
+        writer.write(record("2").to_text())
+    with open(path, "ab") as stream:
+        stream.write(record("2").to_text().encode() + b"\xd0\x9f\xd0\x86\xd0\x91: ")  # незавершений блок
+    log.refresh()
+    assert log.lookup("2") == [record("2")] * 3
+    assert guest_log.GuestLog(path).lookup("2") == [record("2")] * 3
+    assert len(open(guest_log.index_path(path)).readlines()) == 4
+
+def test_map_entries_match_stream_reader(tmp_path):
+    path = tmp_path / "guest_data.txt"
+    with GuestLogWriter(path) as log:
+        log.write_record(record("1"))
+        log.write("ПІБ: без решти полів\n" + guest_log.SEPARATOR + "\n")
+        log.write_record(record("2"))
+        log.write(record("3").to_text().replace("\n", "\r\n"))
+        log.write(f"Примітка: {guest_log.SEPARATOR} у тексті\n")  # не роздільник — частина блоку
+        log.write_record(record("4"))
+        log.write("ПІБ: ще пишеться\n")
+    with open(path, "rb") as stream:
+        expected = list(guest_log.read_entries(stream))
+    assert list(guest_log.map_entries(path)) == expected
+    assert [r.passport for r in guest_log.map_records(path)] == ["1", "2", "3", "4"]
+    assert list(guest_log.map_entries(path, expected[2].start)) == expected[2:]
+    assert list(guest_log.map_entries(path, path.stat().st_size)) == []
+    (tmp_path / "empty.txt").touch()
+    assert list(guest_log.map_entries(tmp_path / "empty.txt")) == []
+
+def test_compaction_dedupes_guests_and_rotates_segments(tmp_path):
+    from hotel import compaction
+
+    source, archive = tmp_path / "guest_data.txt", tmp_path / "archive"
+    stays = [record(str(number % 3)) for number in range(10)]
+    with GuestLogWriter(source) as log:
+        for stay in stays:
+            log.write_record(stay)
+    report = compaction.compact(source, archive, segment_bytes=400, compress=True)
+    assert (report.records, report.guests) == (10, 3)
+    assert report.segments > 1 and report.compacted_bytes < report.source_bytes
+    assert len((archive / compaction.GUESTS).read_text().splitlines()) == 3
+    assert list(compaction.read_compacted(archive)) == stays
+
+    # Повторний запуск дописує лише нові записи; нові дані гостя не переписують попередні заселення
+    moved = GuestRecord(**{**record("1").__dict__, "phone": "+380999"})
+    with GuestLogWriter(source) as log:
+        log.write_record(moved)
+    report = compaction.compact(source, archive, segment_bytes=400, compress=True)
+    assert (report.records, report.guests) == (1, 4)
+    assert list(compaction.read_compacted(archive)) == stays + [moved]
+
+def test_compaction_rotates_source(tmp_path):
+    from hotel import compaction
+
+    source, archive = tmp_path / "guest_data.txt", tmp_path / "archive"
+    stays = [record(str(number)) for number in range(4)]
+    with GuestLogWriter(source) as log:
+        log.write_record(stays[0])
+    compaction.compact(source, archive)
+    with GuestLogWriter(source) as log:
+        log.write_record(stays[1])
+    # Ротація дочищає журнал з уже ущільненого зсуву і видаляє його
+    size = source.stat().st_size
+    report = compaction.compact(source, archive, rotate=True)
+    assert (report.records, report.source_bytes) == (1, size)
+    assert os.listdir(tmp_path) == ["archive"]
+    assert compaction.read_manifest(archive)["offset"] == 0
+
+    # lab3 створює новий журнал; перерваний запуск після перейменування дочищає той самий файл
+    with GuestLogWriter(source) as log:
+        log.write_record(stays[2])
+    manifest = compaction.read_manifest(archive)
+    manifest["rotated"] = "guest_data.txt.1"
+    compaction.write_manifest(archive, manifest)
+    os.rename(source, tmp_path / "guest_data.txt.1")
+    with GuestLogWriter(source) as log:
+        log.write_record(stays[3])
+    assert compaction.compact(source, archive, rotate=True).records == 1
+    assert compaction.compact(source, archive, rotate=True).records == 1
+    assert sorted(os.listdir(tmp_path)) == ["archive"]
+    assert list(compaction.read_compacted(archive)) == stays
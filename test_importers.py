@@ -0,0 +1,143 @@
+import dataclasses
+import datetime
+import io
+import json
+import os
+import subprocess
+import sys
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from hotel import guest_log, importers
+from hotel.Lab4 import (Base, Guest, RoomType, Room, Booking, Payment, RoomNight, RoomStatus, BookingStatus,
+                        PaymentMethod)
+from hotel.lab5 import GuestCreate
+
+CSV = """name,age,phone,email,passport
+Іван,30,+380501,ivan@mail.com,AA1
+Петро,не число,+380502,petro@mail.com,AA2
+Олена,25,+380503,olena@mail.com,AA3
+Марія,40,+380504,без пошти,AA4
+Андрій,35,+380505,andrii@mail.com,AA5
+"""
+
+def test_import_guests_in_batches(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hotel.db'}")
+    Base.metadata.create_all(engine)
+    inserts = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, params, context, many: inserts.append(len(params) if many else 1)
+                 if statement.startswith("INSERT") else None)
+    session = sessionmaker(bind=engine)()
+    report = importers.import_guests(session, importers.read_rows(io.StringIO(CSV), "csv"), GuestCreate, batch_size=2)
+    session.commit()
+    assert (report.total, report.imported, report.failed) == (5, 3, 2)
+    assert [error.line for error in report.errors] == [3, 5]
+    assert report.errors[0].detail.startswith("age:")
+    assert inserts == [2, 1]
+    assert [g.name for g in session.query(Guest).order_by(Guest.id)] == ["Іван", "Олена", "Андрій"]
+    session.close()
+
+def test_csv_row_with_extra_columns_is_reported(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hotel.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    data = CSV.replace("olena@mail.com,AA3", "olena@mail.com,AA3,зайве,ще")
+    report = importers.import_guests(session, importers.read_rows(io.StringIO(data), "csv"), GuestCreate)
+    session.commit()
+    assert (report.total, report.imported, report.failed) == (5, 2, 3)
+    assert report.errors[1].line == 4 and report.errors[1].detail == "зайві значення без заголовка: 2"
+    assert [g.name for g in session.query(Guest).order_by(Guest.id)] == ["Іван", "Андрій"]
+    session.close()
+
+def test_jsonl_rows_report_parse_errors():
+    lines = [json.dumps({"name": "Іван"}), "", "{broken", "[1]"]
+    rows = list(importers.read_rows(io.StringIO("\n".join(lines)), "jsonl"))
+    assert rows[0] == (1, {"name": "Іван"})
+    assert [line for line, _ in rows] == [1, 3, 4]
+    assert all(isinstance(row, str) for _, row in rows[1:])
+
+def test_import_command(tmp_path):
+    path = tmp_path / "guests.csv"
+    path.write_text(CSV, encoding="utf-8")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path), "PYTHONWARNINGS": "ignore",
+           "HOTEL_DATABASE_URL": f"sqlite:///{tmp_path / 'hotel.db'}"}
+    result = subprocess.run([sys.executable, "-m", "hotel", "import", "guests", str(path)],
+                            env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert "Імпортовано 3 з 5 рядків" in result.stdout
+    assert "рядок 5: email:" in result.stdout
+    engine = create_engine(env["HOTEL_DATABASE_URL"])
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM guest").scalar() == 3
+    engine.dispose()
+
+def log_record(passport, room_type="Стандарт", method="готівка"):
+    return guest_log.GuestRecord(name=f"Гість {passport}", age=30, phone="+380501", passport=passport,
+                                 room_type=room_type, check_in=datetime.date(2025, 4, 24),
+                                 check_out=datetime.date(2025, 4, 30), amount=300, method=method)
+
+def test_guest_log_entries_and_offsets():
+    first, second = log_record("A1").to_text(), log_record("B2").to_text()
+    assert guest_log.parse_record(first) == log_record("A1")
+    data = (first + "ПІБ: без решти полів\n" + guest_log.SEPARATOR + "\n" + second + "ПІБ: ще пишеться\n").encode()
+    entries = list(guest_log.read_entries(io.BytesIO(data)))
+    assert [entry.record.passport if entry.record else entry.error[:9] for entry in entries] == ["A1", "немає пол", "B2"]
+    assert entries[0].end == len(first.encode()) == entries[1].start
+    # Незавершений блок у кінці не читається; читання з зсуву пропускає попередні блоки
+    assert entries[-1].end == len(data) - len("ПІБ: ще пишеться\n".encode())
+    assert [entry.record.passport for entry in guest_log.read_entries(io.BytesIO(data), entries[1].end)] == ["B2"]
+
+def test_import_guest_log_resumes_from_checkpoint(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hotel.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(RoomType(id=1, type="Стандарт", price=50, max_guests=2))
+    session.add(Room(id=1, type_id=1, status=RoomStatus.Вільний, price_per_night=50))
+    session.commit()
+    log, checkpoint = tmp_path / "guest_data.txt", tmp_path / "guest_data.checkpoint"
+    log.write_text("".join(log_record(p).to_text() for p in ["A1", "B2", "A1"]) + log_record("C3", "Люкс").to_text(),
+                   encoding="utf-8")
+
+    with open(log, "rb") as stream:
+        report = importers.import_guest_log(session, stream, checkpoint, batch_size=2)
+    assert (report.total, report.imported, report.failed) == (4, 3, 1)
+    assert report.errors[0].detail == "немає кімнат типу Люкс"
+    assert guest_log.read_checkpoint(checkpoint) == log.stat().st_size
+    assert session.query(Guest).count() == 2
+    booking = session.query(Booking).first()
+    assert (booking.room_id, booking.status, booking.price_per_night) == (1, BookingStatus.Завершено, 50)
+    assert [p.method for p in session.query(Payment)] == [PaymentMethod.Готівка] * 3
+
+    with open(log, "a", encoding="utf-8") as file:
+        file.write(log_record("D4", method="карта").to_text() + "ПІБ: Гість E5\n")
+    with open(log, "rb") as stream:
+        report = importers.import_guest_log(session, stream, checkpoint)
+    assert (report.total, report.imported) == (1, 1)
+    assert session.query(Booking).count() == 4
+    assert session.query(Payment).order_by(Payment.id.desc()).first().method == PaymentMethod.Карта
+    session.close()
+
+def test_import_guest_log_assigns_rooms_with_free_nights(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hotel.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(RoomType(id=1, type="Стандарт", price=50, max_guests=1))
+    session.add_all([Room(id=1, type_id=1, status=RoomStatus.Вільний, price_per_night=50),
+                     Room(id=2, type_id=1, status=RoomStatus.На_ремонті, price_per_night=50),
+                     Room(id=3, type_id=1, status=RoomStatus.Вільний, price_per_night=50)])
+    session.commit()
+    # Три заселення, що ще тривають, на ті самі ночі та одне завершене: місце є лише в кімнатах 1 і 3
+    future = {"check_in": datetime.date(2099, 5, 1), "check_out": datetime.date(2099, 5, 4)}
+    records = [dataclasses.replace(log_record(p), **future) for p in ["A1", "B2", "C3"]] + [log_record("D4")]
+    log = tmp_path / "guest_data.txt"
+    log.write_text("".join(record.to_text() for record in records), encoding="utf-8")
+
+    with open(log, "rb") as stream:
+        report = importers.import_guest_log(session, stream, batch_size=2)
+    assert (report.total, report.imported, report.failed) == (4, 3, 1)
+    assert report.errors[0].detail == "немає вільної кімнати типу Стандарт на 2099-05-01—2099-05-04"
+    assert [(b.room_id, b.status) for b in session.query(Booking).order_by(Booking.id)] == [
+        (1, BookingStatus.Активно), (3, BookingStatus.Активно), (1, BookingStatus.Завершено)]
+    assert session.query(Guest).count() == 3
+    assert {(n.room_id, n.booked_count) for n in session.query(RoomNight)} == {(1, 1), (3, 1)}
+    session.close()
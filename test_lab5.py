@@ -0,0 +1,477 @@
+import pytest
+import csv
+import io
+import inspect
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+import hotel.lab5 as lab5
+from hotel import db
+from hotel.Lab4 import (Base, Guest, RoomType, Room, Booking, RoomNight, Service, GuestService, RoomStatus,
+                        BookingStatus, Payment, PaymentMethod, rebuild_room_nights, upgrade_schema)
+
+@pytest.fixture
+def engine(tmp_path):
+    # Файлова база, щоб синхронні та асинхронні ендпоінти бачили ті самі дані
+    db.configure(f"sqlite:///{tmp_path / 'test.db'}")
+    engine = db.get_engine()
+    Base.metadata.create_all(engine)
+    yield engine
+    db.configure()
+
+@pytest.fixture
+def client(engine):
+    with TestClient(lab5.app) as client:
+        yield client
+
+def add_bookings(engine, count):
+    session = sessionmaker(bind=engine)()
+    rt = RoomType(type="Люкс", price=150, max_guests=4)
+    session.add(rt)
+    session.flush()
+    for i in range(count):
+        guest = Guest(name=f"Гість {i}", age=30, phone=str(i), email=f"g{i}@mail.com", passport=str(i))
+        room = Room(type_id=rt.id, status=RoomStatus.Вільний, price_per_night=150)
+        session.add_all([guest, room])
+        session.flush()
+        session.add(Booking(guest_id=guest.id, room_id=room.id,
+                            check_in=datetime.date(2025, 6, 1) + datetime.timedelta(days=i),
+                            check_out=datetime.date(2025, 6, 3) + datetime.timedelta(days=i),
+                            status=BookingStatus.Активно, price_per_night=150))
+    session.flush()
+    rebuild_room_nights(session)
+    session.commit()
+    session.close()
+
+def count_statements(engine, func):
+    statements = []
+    # BEGIN, який рушій виконує сам, — не запит
+    listener = lambda *args: args[2].startswith("BEGIN") or statements.append(args[2])
+    engines = [engine, db.get_async_engine().sync_engine]
+    for target in engines:
+        event.listen(target, "before_cursor_execute", listener)
+    try:
+        func()
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", listener)
+    return len(statements)
+
+#Тести
+@pytest.mark.parametrize("url", ["/bookings/", "/bookings/sorted/", "/bookings/search/?keyword=Гість"])
+def test_booking_list_is_constant_queries(engine, client, url):
+    add_bookings(engine, 3)
+    few = count_statements(engine, lambda: client.get(url))
+    add_bookings(engine, 30)
+    many = count_statements(engine, lambda: client.get(url))
+    assert few == many == 1
+
+def test_booking_list_contents(engine, client):
+    add_bookings(engine, 2)
+    data = client.get("/bookings/sorted/").json()
+    assert [b["guest_name"] for b in data] == ["Гість 0", "Гість 1"]
+    assert data[0]["room_type"] == "Люкс"
+    assert data[0]["status"] == "Активно"
+
+def test_booking_search_not_found(engine, client):
+    add_bookings(engine, 1)
+    assert client.get("/bookings/search/?keyword=Нема").json()["detail"] == "Гості не знайдені"
+
+def test_booking_cancelled_outside_api_frees_room(engine, client):
+    add_bookings(engine, 1)
+    booking = {"guest_id": 1, "room_id": 1, "check_in": "2025-06-01", "check_out": "2025-06-03"}
+    for _ in range(3):
+        assert client.post("/bookings/", json=booking).status_code == 200
+    assert client.post("/bookings/", json=booking).status_code == 400
+    # Скасування з CLI: календар звільнено, статус кімнати ще «Зайнятий»
+    session = sessionmaker(bind=engine)()
+    cancelled = session.get(Booking, 2)
+    cancelled.status = BookingStatus.Скасовано
+    rebuild_room_nights(session)
+    session.commit()
+    session.close()
+    assert client.post("/bookings/", json=booking).status_code == 200
+
+def test_availability_search(engine, client):
+    add_bookings(engine, 3)
+    params = {"check_in": "2025-06-02", "check_out": "2025-06-03"}
+    free = {r["room_id"]: r["free"] for r in client.get("/availability", params=params).json()}
+    assert free == {1: 3, 2: 3, 3: 4}
+    rooms = client.get("/availability", params={**params, "guests": 4}).json()
+    assert [r["room_id"] for r in rooms] == [3]
+    assert client.get("/availability", params={**params, "type": "Стандарт"}).json() == []
+    assert count_statements(engine, lambda: client.get("/availability", params=params)) == 1
+
+def test_availability_search_matches_add_booking(engine, client):
+    add_bookings(engine, 2)
+    booking = {"guest_id": 1, "room_id": 1, "check_in": "2025-06-01", "check_out": "2025-06-03"}
+    for _ in range(3):
+        assert client.post("/bookings/", json=booking).status_code == 200
+    # Кімната 1 заповнена в червні: на ці дати її немає ні в пошуку, ні серед прийнятих бронювань,
+    # а в липні вона знову вільна для обох
+    june = {"check_in": "2025-06-02", "check_out": "2025-06-03"}
+    assert [r["room_id"] for r in client.get("/availability", params=june).json()] == [2]
+    assert client.post("/bookings/", json={**booking, **june}).status_code == 400
+    july = {"check_in": "2025-07-01", "check_out": "2025-07-03"}
+    assert [r["room_id"] for r in client.get("/availability", params=july).json()] == [1, 2]
+    assert client.post("/bookings/", json={**booking, **july}).status_code == 200
+    # Кімнату на ремонті не пропонує пошук і не приймає add_booking
+    session = sessionmaker(bind=engine)()
+    session.get(Room, 2).status = RoomStatus.На_ремонті
+    session.commit()
+    session.close()
+    assert [r["room_id"] for r in client.get("/availability", params=july).json()] == [1]
+    assert client.post("/bookings/", json={**booking, **july, "room_id": 2}).status_code == 400
+
+def test_room_night_calendar_follows_bookings(engine, client):
+    add_bookings(engine, 1)
+    booking = {"guest_id": 1, "room_id": 1, "check_in": "2025-06-02", "check_out": "2025-06-05"}
+    assert client.post("/bookings/", json=booking).status_code == 200
+    report = client.get("/occupancy", params={"start": "2025-06-01", "end": "2025-06-06"}).json()
+    assert [day["booked"] for day in report] == [1, 2, 1, 1]
+    client.put("/bookings/2", json={"check_in": "2025-06-03"})
+    client.put("/bookings/1", json={"status": "Скасовано"})
+    report = client.get("/occupancy", params={"start": "2025-06-01", "end": "2025-06-06"}).json()
+    assert [(day["date"], day["booked"]) for day in report] == [("2025-06-03", 1), ("2025-06-04", 1)]
+    client.delete("/bookings/2")
+    assert sessionmaker(bind=engine)().query(RoomNight).count() == 0
+
+def test_edit_booking_respects_nightly_capacity(engine, client):
+    add_bookings(engine, 1)  # бронювання 1: 1-3 червня
+    session = sessionmaker(bind=engine)()
+    session.get(RoomType, 1).max_guests = 2
+    session.commit()
+    session.close()
+    for day in (5, 7):
+        booking = {"guest_id": 1, "room_id": 1, "check_in": f"2025-06-{day:02d}", "check_out": f"2025-06-{day + 1:02d}"}
+        assert client.post("/bookings/", json=booking).status_code == 200
+    move = {"check_in": "2025-06-01", "check_out": "2025-06-02"}
+    assert client.put("/bookings/2", json=move).status_code == 200
+    response = client.put("/bookings/3", json=move)
+    assert response.status_code == 400 and response.json()["detail"] == "Кімната вже зайнята на ці дати"
+    # Скасоване бронювання не можна знову активувати поверх заповнених ночей
+    assert client.put("/bookings/3", json={"status": "Скасовано"}).status_code == 200
+    assert client.put("/bookings/3", json={**move, "status": "Активно"}).status_code == 400
+    session = sessionmaker(bind=engine)()
+    assert max(n.booked_count for n in session.query(RoomNight)) == 2
+    assert session.get(Booking, 3).check_in == datetime.date(2025, 6, 7)
+    session.close()
+    assert [r["room_id"] for r in client.get("/availability", params={"check_in": "2025-06-07", "check_out": "2025-06-08"}).json()] == [1]
+
+def test_add_booking_respects_nightly_capacity(engine, client):
+    add_bookings(engine, 1)
+    # Бронювання 1: 1-3 червня; послідовні бронювання не перетинаються між собою
+    for check_in, check_out in [("2025-06-03", "2025-06-04"), ("2025-06-04", "2025-06-05")] * 3:
+        booking = {"guest_id": 1, "room_id": 1, "check_in": check_in, "check_out": check_out}
+        assert client.post("/bookings/", json=booking).status_code == 200
+    booking = {"guest_id": 1, "room_id": 1, "check_in": "2025-06-01", "check_out": "2025-06-05"}
+    assert client.post("/bookings/", json=booking).status_code == 200
+    assert client.post("/bookings/", json=booking).status_code == 400
+
+def test_keyset_pagination(engine, client):
+    add_bookings(engine, 7)
+    ids, after_id = [], None
+    while True:
+        params = {"limit": 3} if after_id is None else {"limit": 3, "after_id": after_id}
+        page = client.get("/bookings/", params=params).json()
+        if not page:
+            break
+        ids += [b["id"] for b in page]
+        after_id = page[-1]["id"]
+    assert ids == list(range(1, 8))
+    rooms = client.get("/room/", params={"after_id": 5}).json()
+    assert [(r["id"], r["type"]) for r in rooms] == [(6, "Люкс"), (7, "Люкс")]
+
+def test_fields_projection(engine, client):
+    add_bookings(engine, 2)
+    assert client.get("/guest/", params={"fields": "id,name"}).json() == [
+        {"id": 1, "name": "Гість 0"}, {"id": 2, "name": "Гість 1"}]
+    # id потрібен для наступної сторінки, тож повертається і без запиту
+    first = client.get("/bookings/", params={"fields": "guest_name,status", "limit": 1}).json()
+    assert first == [{"id": 1, "guest_name": "Гість 0", "status": "Активно"}]
+    assert client.get("/bookings/", params={"fields": "guest_name", "after_id": first[-1]["id"]}).json() == [
+        {"id": 2, "guest_name": "Гість 1"}]
+    assert client.get("/room/", params={"fields": "id,secret"}).status_code == 400
+
+def test_streaming_export(engine, client):
+    add_bookings(engine, 3)
+    lines = client.get("/export/bookings.ndjson").text.splitlines()
+    assert [json.loads(line)["guest_name"] for line in lines] == ["Гість 0", "Гість 1", "Гість 2"]
+    assert json.loads(lines[0])["check_in"] == "2025-06-01"
+    response = client.get("/export/bookings.csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == list(lab5.BOOKING_READ_COLUMNS)
+    assert [row[2] for row in rows[1:]] == ["Гість 0", "Гість 1", "Гість 2"]
+    assert rows[1][7] == "Активно"
+    assert client.get("/export/payments.csv").text.splitlines() == ["id,booking_id,amount,date,method,version"]
+    assert client.get("/export/payments.xml").status_code == 422
+
+def test_invoice_counts_only_services_of_the_stay(engine, client):
+    add_bookings(engine, 1)
+    session = sessionmaker(bind=engine)()
+    session.add_all([Service(name="Сніданок", price=10), Service(name="SPA", price=100)])
+    for day, service_id in [(1, 1), (2, 1), (3, 1), (2, 2), (20, 2)]:
+        session.add(GuestService(guest_id=1, service_id=service_id, date=datetime.date(2025, 6, day)))
+    session.add(GuestService(guest_id=1, service_id=2))
+    session.commit()
+    invoice = client.get("/bookings/1/invoice").json()
+    assert invoice["room_cost"] == 300
+    assert [(s["name"], s["quantity"], s["amount"]) for s in invoice["services"]] == [("SPA", 1, 100), ("Сніданок", 3, 30)]
+    assert invoice["total"] == 430
+    assert count_statements(engine, lambda: client.get("/bookings/1/invoice")) == 2
+    payment = client.post("/payments/", json={"booking_id": 1, "method": "Карта"})
+    assert payment.status_code == 200 and payment.json()["amount"] == 430
+    session.close()
+
+def test_changeover_day_service_is_billed_once(engine, client):
+    add_bookings(engine, 1)  # бронювання 1: 1-3 червня
+    session = sessionmaker(bind=engine)()
+    session.add(Service(name="Сніданок", price=10))
+    session.add(Booking(guest_id=1, room_id=1, check_in=datetime.date(2025, 6, 3), check_out=datetime.date(2025, 6, 5),
+                        status=BookingStatus.Активно, price_per_night=150))
+    for day in (1, 3, 5):
+        session.add(GuestService(guest_id=1, service_id=1, date=datetime.date(2025, 6, day)))
+    session.commit()
+    quantities = [client.get(f"/bookings/{booking_id}/invoice").json()["services"][0]["quantity"] for booking_id in (1, 2)]
+    # 3 червня — заїзд другого проживання, тож сніданок цього дня лише в другому рахунку
+    assert quantities == [1, 2]
+    # Без наступного проживання день виїзду знову належить першому
+    session.get(Booking, 2).status = BookingStatus.Скасовано
+    session.commit()
+    assert client.get("/bookings/1/invoice").json()["services"][0]["quantity"] == 2
+    session.close()
+
+def test_upgrade_schema_adds_guest_service_date(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE guest_service (id INTEGER PRIMARY KEY, guest_id INTEGER, service_id INTEGER)")
+        conn.exec_driver_sql("INSERT INTO guest_service (guest_id, service_id) VALUES (1, 1)")
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+    session = sessionmaker(bind=engine)()
+    assert session.query(GuestService.date).scalar() is None
+    session.close()
+
+def test_upgrade_schema_from_concurrent_workers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    with create_engine(url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE guest_service (id INTEGER PRIMARY KEY, guest_id INTEGER, service_id INTEGER)")
+    # Кожен воркер API оновлює схему при старті зі своїм рушієм
+    engines = [db.create_hotel_engine(url) for _ in range(8)]
+    barrier, errors = threading.Barrier(len(engines)), []
+
+    def start_worker(engine):
+        barrier.wait()
+        try:
+            upgrade_schema(engine)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=start_worker, args=(engine,)) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for engine in engines:
+        engine.dispose()
+    assert errors == []
+
+@pytest.mark.parametrize("path", ["/guest/", "/room/", "/bookings/", "/bookings/sorted/", "/bookings/search/",
+                                  "/availability", "/occupancy"])
+def test_hot_read_endpoints_are_async(path):
+    route = next(r for r in lab5.router.routes if r.path == path and "GET" in r.methods)
+    assert inspect.iscoroutinefunction(route.endpoint)
+
+def test_import_has_no_side_effects(tmp_path):
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path), "PYTHONWARNINGS": "ignore",
+           "HOTEL_DATABASE_URL": f"sqlite:///{tmp_path / 'hotel.db'}"}
+    code = ("import sys, hotel.lab5, hotel.db; assert hotel.db._engine is None and 'aiosqlite' not in sys.modules"
+            " and 'sqlalchemy.ext.asyncio' not in sys.modules")
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == ""
+    assert not (tmp_path / "hotel.db").exists()
+
+def stress_worker(requests, barrier, results):
+    client = TestClient(lab5.create_app())
+    barrier.wait()
+    booking = {"guest_id": 1, "room_id": 1, "check_in": "2025-06-02", "check_out": "2025-06-04"}
+    results.put([client.post("/bookings/", json=booking).status_code for _ in range(requests)])
+
+def test_no_overbooking_across_worker_processes(engine, monkeypatch):
+    add_bookings(engine, 1)  # кімната на 4 гостей, одне бронювання 1-3 червня
+    monkeypatch.setenv("HOTEL_DATABASE_URL", str(engine.url))
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(4), context.Queue()
+    workers = [context.Process(target=stress_worker, args=(5, barrier, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    codes = sum((results.get(timeout=120) for _ in workers), [])
+    for worker in workers:
+        worker.join()
+    assert codes.count(200) == 3
+    assert set(codes) <= {200, 400}
+    session = sessionmaker(bind=engine)()
+    assert session.query(Booking).filter(Booking.status == BookingStatus.Активно).count() == 4
+    assert max(n.booked_count for n in session.query(RoomNight)) == 4
+    session.close()
+
+def test_stale_session_cannot_overwrite_booking(engine):
+    add_bookings(engine, 1)
+    first, second = sessionmaker(bind=engine)(), sessionmaker(bind=engine, expire_on_commit=False)()
+    # Другий користувач прочитав запис раніше, в окремій транзакції (як форма інтерфейсу)
+    stale = second.get(Booking, 1)
+    second.commit()
+    first.get(Booking, 1).status = BookingStatus.Скасовано
+    first.commit()
+    stale.check_out = datetime.date(2025, 6, 10)
+    with pytest.raises(StaleDataError):
+        second.commit()
+    second.rollback()
+    booking = second.get(Booking, 1)
+    assert (booking.status, booking.check_out, booking.version) == (BookingStatus.Скасовано, datetime.date(2025, 6, 3), 2)
+    first.close()
+    second.close()
+
+def test_stale_version_returns_409(engine, client):
+    add_bookings(engine, 1)
+    version = client.get("/bookings/").json()[0]["version"]
+    updated = client.put("/bookings/1", json={"check_out": "2025-06-04", "version": version})
+    assert updated.status_code == 200 and updated.json()["version"] == version + 1
+    assert client.put("/bookings/1", json={"check_out": "2025-06-05", "version": version}).status_code == 409
+    assert client.delete("/bookings/1", params={"version": version}).status_code == 409
+    room = client.get("/room/").json()[0]
+    assert client.put("/room/1", json={"type_id": None, "status": None, "price_per_night": 120, "version": room["version"] + 1}).status_code == 409
+    assert client.put("/room/1", json={"type_id": None, "status": None, "price_per_night": 120, "version": room["version"]}).status_code == 200
+
+    payment = client.post("/payments/", json={"booking_id": 1, "method": "Карта"}).json()
+    assert client.put("/payments/1", json={"method": "Готівка", "version": payment["version"]}).json()["method"] == "Готівка"
+    assert client.put("/payments/1", json={"amount": 0, "version": payment["version"]}).status_code == 409
+    session = sessionmaker(bind=engine)()
+    assert session.get(Payment, 1).method == PaymentMethod.Готівка
+    assert session.get(Booking, 1).check_out == datetime.date(2025, 6, 4)
+    session.close()
+
+def test_concurrent_edits_of_same_version(engine, client):
+    add_bookings(engine, 1)
+    version = client.get("/bookings/").json()[0]["version"]
+    barrier, codes = threading.Barrier(8), []
+
+    def edit(day):
+        barrier.wait()
+        response = client.put("/bookings/1", json={"check_out": f"2025-06-{day:02d}", "version": version})
+        codes.append(response.status_code)
+
+    threads = [threading.Thread(target=edit, args=(day,)) for day in range(4, 12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(codes) == [200] + [409] * 7
+    session = sessionmaker(bind=engine)()
+    booking = session.get(Booking, 1)
+    assert booking.version == version + 1
+    # Календар зайнятості змінено рівно один раз
+    assert session.query(RoomNight).filter(RoomNight.booked_count > 0).count() == \
+        (booking.check_out - booking.check_in).days
+    session.close()
+
+def test_upgrade_schema_backfills_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE payment (id INTEGER PRIMARY KEY, booking_id INTEGER, amount FLOAT, "
+                             "date DATE, method VARCHAR(6))")
+        conn.exec_driver_sql("INSERT INTO payment (booking_id, amount, method) VALUES (1, 100, 'Карта')")
+    upgrade_schema(engine)
+    session = sessionmaker(bind=engine)()
+    payment = session.get(Payment, 1)
+    assert payment.version == 1
+    payment.amount = 90
+    session.commit()
+    assert payment.version == 2
+    session.close()
+
+def test_api_startup_upgrades_old_database(engine):
+    add_bookings(engine, 1)
+    with engine.begin() as conn:
+        for table in ("room", "booking", "payment"):
+            conn.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN version")
+    with TestClient(lab5.create_app()) as client:
+        assert client.get("/room/").json()[0]["version"] == 1
+        assert client.get("/bookings/").json()[0]["version"] == 1
+
+def test_bulk_booking_modes(engine, client):
+    add_bookings(engine, 2)  # кімнати на 4 гостей, по одному бронюванню 1-3 та 2-4 червня
+    booking = {"guest_id": 1, "room_id": 1, "check_in": "2025-06-01", "check_out": "2025-06-03"}
+    items = [booking, booking, {**booking, "room_id": 2}, booking, booking, {**booking, "guest_id": 99},
+             {**booking, "check_out": "2025-06-01"}]
+    response = client.post("/bookings/bulk", json={"items": items})
+    assert response.status_code == 400
+    assert [item["status"] for item in response.json()["items"]] == ["skipped"] * 4 + ["rejected"] * 3
+    session = sessionmaker(bind=engine)()
+    assert session.query(Booking).count() == 2
+    session.rollback()
+
+    response = client.post("/bookings/bulk", json={"items": items, "mode": "best_effort"}).json()
+    assert (response["created"], response["rejected"]) == (4, 3)
+    assert [item["detail"] for item in response["items"][4:]] == [
+        "Кімната вже зайнята на цей період. Макс гостей: 4", "Гість не знайдений",
+        "Дата виїзду повинна бути пізніше дати заїзду"]
+    assert [item["booking"]["id"] for item in response["items"][:4]] == [3, 4, 5, 6]
+    # Як після послідовних POST /bookings/: четвертий гість заповнив кімнату 1
+    assert session.get(Room, 1).status == RoomStatus.Зайнятий
+    assert session.get(Room, 2).status == RoomStatus.Вільний
+    assert [(n.room_id, str(n.date), n.booked_count) for n in session.query(RoomNight).order_by(RoomNight.room_id, RoomNight.date)] == [
+        (1, "2025-06-01", 4), (1, "2025-06-02", 4), (2, "2025-06-01", 1), (2, "2025-06-02", 2), (2, "2025-06-03", 1)]
+    assert [b["id"] for b in client.get("/bookings/").json()] == [1, 2, 3, 4, 5, 6]
+    session.close()
+
+def test_bulk_booking_is_constant_queries(engine, client):
+    add_bookings(engine, 60)
+
+    def bulk(count):
+        items = [{"guest_id": i, "room_id": i, "check_in": "2025-09-01", "check_out": "2025-09-05"}
+                 for i in range(1, count + 1)]
+        assert client.post("/bookings/bulk", json={"items": items}).json()["created"] == count
+
+    assert count_statements(engine, lambda: bulk(5)) == count_statements(engine, lambda: bulk(50))
+
+def test_guest_import_endpoint(engine, client):
+    lines = [{"name": f"Гість {i}", "age": 30, "phone": str(i), "email": f"g{i}@mail.com", "passport": str(i)}
+             for i in range(5)]
+    lines[2]["email"] = "без пошти"
+    body = "\n".join(json.dumps(line, ensure_ascii=False) for line in lines).encode()
+    response = client.post("/guest/import", params={"batch_size": 2}, files={"file": ("guests.jsonl", body)})
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["total"], report["imported"], report["failed"]) == (5, 4, 1)
+    assert report["errors"][0]["line"] == 3
+    assert [g["name"] for g in client.get("/guest/").json()] == ["Гість 0", "Гість 1", "Гість 3", "Гість 4"]
+    assert client.post("/guest/import", files={"file": ("guests.xlsx", b"")}).status_code == 400
+    csv_body = "name,age,phone,email,passport\nІван,30,1,ivan@mail.com,AA1\n".encode("utf-8-sig")
+    assert client.post("/guest/import", params={"format": "csv"},
+                       files={"file": ("upload", csv_body)}).json()["imported"] == 1
+
+def test_guests_imported_from_lab3_log_are_listed(engine, client):
+    from hotel import importers
+    session = sessionmaker(bind=engine)()
+    session.add(RoomType(type="Стандарт", price=50, max_guests=2))
+    session.flush()
+    session.add(Room(type_id=1, status=RoomStatus.Вільний, price_per_night=50))
+    session.commit()
+    with open(os.path.join(os.path.dirname(lab5.__file__), "guest_data.txt"), "rb") as stream:
+        report = importers.import_guest_log(session, stream)
+    session.close()
+    assert report.imported == 2
+    guests = client.get("/guest/")
+    assert guests.status_code == 200 and [g["email"] for g in guests.json()] == [None, None]
+    found = client.get("/guest/search", params={"keyword": "Олег"})
+    assert found.status_code == 200 and found.json()[0]["passport"] == "32510"